@@ -1,4 +1,13 @@
 """ Initialization of package module uc3m... """
-from .certidigitalmanager import CertiDigitalManager
+from .certidigitalmanager import CertiDigitalManager, CertiDigitalCredentialDetails
 from .certidigitalutil import CertiDigitalUtil
 from .certidigitalexception import CertiDigitalException
+from .certidigitalconfig import CertiDigitalConfig, CertiDigitalJsonCache
+from .certidigitalvalidator import CertiDigitalRecipientValidator, CertiDigitalIssuedLedger
+from .certidigitalscheduler import CertiDigitalEmissionScheduler
+from .certidigitaloutput import CertiDigitalOutputSink, CertiDigitalFileSink, CertiDigitalArchiveSink
+from .certidigitalblockstatus import CertiDigitalEmissionBlockStatus
+from .certidigitalupload import CertiDigitalUploadProgress
+from .certidigitaljson import CertiDigitalJsonCodec
+from .certidigitalprofiler import CertiDigitalProfiler
+from .certidigitalpdfcache import CertiDigitalPdfCache
@@ -0,0 +1,163 @@
+""" Compact status of an emission block, parsed incrementally from the API response... """
+import codecs
+import json
+import re
+from array import array
+from collections import Counter
+
+from .certidigitalexception import CertiDigitalException
+
+
+class CertiDigitalEmissionBlockStatus:
+    """ Keeps only the uuid and the stateId of every emission of a block, as parallel arrays...
+        The response is parsed emission by emission while it's downloaded, so the whole block is never held in memory as dicts. """
+
+    NO_STATUS = 13
+
+    def __init__(self, uuids=None, state_ids=None, info=None):
+        self.__uuids = uuids if uuids is not None else []
+        self.__state_ids = state_ids if state_ids is not None else array("B")
+        self.__info = info if info is not None else {}
+
+    def __len__(self):
+        return len(self.__uuids)
+
+    @property
+    def uuids(self):
+        """ Returns the uuids of the emissions, in the order of the response... """
+        return self.__uuids
+
+    @property
+    def state_ids(self):
+        """ Returns the state ids of the emissions (NO_STATUS when the emission has none)... """
+        return self.__state_ids
+
+    @property
+    def info(self):
+        """ Returns the scalar top-level fields of the block (id, alias...)... """
+        return self.__info
+
+    def add(self, uuid, state_id):
+        """ Appends an emission to the status... """
+        self.__uuids.append(uuid)
+        self.__state_ids.append(state_id or self.NO_STATUS)
+
+    def get_uuids(self, state_id=None):
+        """ Returns the uuids of the emissions in the given state (all of them when no state is given)... """
+        if state_id is None:
+            return list(self.__uuids)
+        return [uuid for uuid, state in zip(self.__uuids, self.__state_ids) if state == state_id]
+
+    def count_by_state(self):
+        """ Returns the number of emissions in each state, as a list indexed by state id - 1... """
+        counter = Counter(self.__state_ids)
+        return [counter.get(state_id, 0) for state_id in range(1, self.NO_STATUS + 1)]
+
+    @classmethod
+    def from_json(cls, emission_block):
+        """ Builds the status from an already parsed emission block (as returned by get_emissions_block_data)... """
+        status = cls(info={key: value for key, value in emission_block.items() if not isinstance(value, (dict, list))})
+        for emission in emission_block.get("emissions") or []:
+            status.add(emission["uuid"], emission.get("stateId"))
+        return status
+
+    @classmethod
+    def from_chunks(cls, chunks):
+        """ Parses the emission block JSON from an iterable of byte chunks (e.g. response.iter_content()), keeping only the projection... """
+        return _BlockStatusParser(cls(), iter(chunks)).parse()
+
+
+class _BlockStatusParser:
+    """ Incremental parser of the emission block response: top-level values are skipped (scalars kept),
+        and every element of the emissions array is decoded on its own and reduced to uuid and stateId... """
+
+    __whitespace = re.compile(r"[ \t\n\r]*")
+    __decoder = json.JSONDecoder()
+
+    def __init__(self, status, chunks):
+        self.__status = status
+        self.__chunks = chunks
+        self.__text_decoder = codecs.getincrementaldecoder("utf-8")()
+        self.__buffer = ""
+        self.__pos = 0
+        self.__exhausted = False
+
+    def __read_more(self, min_size=1):
+        """ Appends at least min_size characters to the buffer (dropping the already parsed ones), False at the end of the stream... """
+        buffer = self.__buffer[self.__pos:]
+        target = len(buffer) + min_size
+        while len(buffer) < target and not self.__exhausted:
+            try:
+                buffer += self.__text_decoder.decode(next(self.__chunks))
+            except StopIteration:
+                buffer += self.__text_decoder.decode(b"", final=True)
+                self.__exhausted = True
+        grown = len(buffer) > len(self.__buffer) - self.__pos
+        self.__buffer = buffer
+        self.__pos = 0
+        return grown
+
+    def __peek(self):
+        """ Skips whitespace and returns the next character ('' at the end of the stream)... """
+        while True:
+            self.__pos = self.__whitespace.match(self.__buffer, self.__pos).end()
+            if self.__pos < len(self.__buffer):
+                return self.__buffer[self.__pos]
+            if not self.__read_more():
+                return ""
+
+    def __expect(self, chars):
+        """ Consumes the next character, which must be one of chars... """
+        char = self.__peek()
+        if char == "" or char not in chars:
+            raise CertiDigitalException("Wrong emission block format: expected " + chars + " at " + repr(char))
+        self.__pos += 1
+        return char
+
+    def __decode_value(self):
+        """ Decodes the next complete JSON value, reading more data (doubling the buffer) until it's complete... """
+        self.__peek()
+        while True:
+            try:
+                value, end = self.__decoder.raw_decode(self.__buffer, self.__pos)
+                if end < len(self.__buffer) or self.__exhausted or self.__buffer[self.__pos] in "{[\"":
+                    self.__pos = end
+                    return value
+            except json.JSONDecodeError:
+                pass
+            # Numbers/literals may be cut at the end of the buffer and containers may be incomplete: read more...
+            if not self.__read_more(max(len(self.__buffer) - self.__pos, 65536)):
+                try:
+                    value, self.__pos = self.__decoder.raw_decode(self.__buffer, self.__pos)
+                    return value
+                except json.JSONDecodeError as e:
+                    raise CertiDigitalException("Wrong emission block format") from e
+
+    def parse(self):
+        """ Parses the whole response and returns the filled status... """
+        self.__expect("{")
+        if self.__peek() == "}":
+            return self.__status
+        while True:
+            key = self.__decode_value()
+            self.__expect(":")
+            if key == "emissions" and self.__peek() == "[":
+                self.__parse_emissions()
+            else:
+                value = self.__decode_value()
+                if not isinstance(value, (dict, list)):
+                    self.__status.info[key] = value
+            if self.__expect(",}") == "}":
+                return self.__status
+
+    def __parse_emissions(self):
+        """ Decodes the emissions array one element at a time... """
+        self.__expect("[")
+        if self.__peek() == "]":
+            self.__pos += 1
+            return
+        while True:
+            emission = self.__decode_value()
+            self.__status.add(emission["uuid"], emission.get("stateId"))
+            if self.__expect(",]") == "]":
+                return
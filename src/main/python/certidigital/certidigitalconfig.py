@@ -0,0 +1,150 @@
+""" Configuration module for the CertiDigital software. Holds the data paths and the cached data files... """
+import json
+import os
+import threading
+from pathlib import Path
+
+from .certidigitalexception import CertiDigitalException
+from .certidigitaljson import CertiDigitalJsonCodec
+from .certidigitalpdfcache import CertiDigitalPdfCache
+from .certidigitalprofiler import CertiDigitalProfiler
+
+
+class CertiDigitalJsonCache:
+    """ Memoizing cache of parsed JSON files, keyed by path and invalidated by modification time... """
+
+    def __init__(self):
+        self.__entries = {}
+        self.__lock = threading.Lock()
+
+    def get(self, fi):
+        """ Returns the parsed content of the file. It's only parsed again when the file changes on disk, otherwise costs a stat call...
+            Returned data is shared between callers (threads, jobs...) and must not be modified. """
+        path = os.path.abspath(fi)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError as e:
+            raise CertiDigitalException("Wrong file or file path") from e
+        version = (stat.st_mtime_ns, stat.st_size)
+        with self.__lock:
+            entry = self.__entries.get(path)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        try:
+            with open(path, encoding='UTF-8', mode='r') as f:
+                data = CertiDigitalJsonCodec.get_default().loads(f.read())
+        except FileNotFoundError as e:
+            raise CertiDigitalException("Wrong file or file path") from e
+        except json.JSONDecodeError as e:
+            raise CertiDigitalException("Wrong json file format") from e
+        with self.__lock:
+            self.__entries[path] = (version, data)
+        return data
+
+    def invalidate(self, fi=None):
+        """ Drops a file from the cache (or every file when none is given)... """
+        with self.__lock:
+            if fi is None:
+                self.__entries.clear()
+            else:
+                self.__entries.pop(os.path.abspath(fi), None)
+
+
+_shared_json_cache = CertiDigitalJsonCache()
+
+
+class CertiDigitalConfig:
+    """ Single configuration object for the CertiDigital software (data root, output folder and data files)...
+        The data root is taken from the constructor, the CERTIDIGITAL_DATA_PATH environment variable or the src/data folder of the project. """
+
+    DEFAULT_PATH_DATA = str(Path(__file__).resolve().parents[3] / "data")
+
+    __default = None
+    __default_lock = threading.Lock()
+
+    def __init__(self, path_data=None, path_output=None, json_cache=None):
+        self.__path_data = str(path_data or os.environ.get("CERTIDIGITAL_DATA_PATH") or self.DEFAULT_PATH_DATA).rstrip("/")
+        default_path_output = str(Path(self.__path_data).parent / "unittest" / "output_files")
+        self.__path_output = str(path_output or os.environ.get("CERTIDIGITAL_OUTPUT_PATH") or default_path_output).rstrip("/")
+        self.__json_cache = json_cache or _shared_json_cache
+        self.__profiler = None
+        self.__profiler_lock = threading.Lock()
+        self.__pdf_cache = None
+        self.__pdf_cache_lock = threading.Lock()
+
+    @classmethod
+    def get_default(cls):
+        """ Returns the configuration shared by every manager and util created without an explicit one... """
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls()
+            return cls.__default
+
+    @classmethod
+    def set_default(cls, config):
+        """ Replaces the shared configuration (None resets it to the environment/project defaults)... """
+        with cls.__default_lock:
+            cls.__default = config
+
+    @property
+    def path_data(self):
+        """ Returns the data root folder... """
+        return self.__path_data
+
+    @property
+    def path_output(self):
+        """ Returns the folder where downloaded credentials are written... """
+        return self.__path_output
+
+    @property
+    def json_cache(self):
+        """ Returns the JSON file cache used by this configuration... """
+        return self.__json_cache
+
+    @property
+    def profiler(self):
+        """ Returns the profiler of the emission pipeline phases (enabled by the profiling parameter, output to path_output)... """
+        if self.__profiler is None:
+            with self.__profiler_lock:
+                if self.__profiler is None:
+                    self.__profiler = CertiDigitalProfiler(bool(self.get_param("profiling", False)), self.__path_output)
+        return self.__profiler
+
+    @property
+    def pdf_cache(self):
+        """ Returns the cache of rendered PDFs shared by every manager with this configuration (None when pdf_cache_dir isn't set)... """
+        cache_dir = self.get_param("pdf_cache_dir", "")
+        if not cache_dir:
+            return None
+        with self.__pdf_cache_lock:
+            path_cache = self.data_file(cache_dir)
+            if self.__pdf_cache is None or self.__pdf_cache.path_cache != path_cache:
+                self.__pdf_cache = CertiDigitalPdfCache(path_cache, self.get_param("pdf_cache_max_bytes", 1073741824))
+            return self.__pdf_cache
+
+    def data_file(self, *parts):
+        """ Returns the path of a file inside the data root... """
+        return str(Path(self.__path_data).joinpath(*parts))
+
+    def read_json(self, *parts):
+        """ Returns the (cached, read-only) content of a JSON file inside the data root... """
+        return self.__json_cache.get(self.data_file(*parts))
+
+    @property
+    def params(self):
+        """ Returns the execution parameters (params.json)... """
+        return self.read_json("params.json")
+
+    def get_param(self, name, default=None):
+        """ Returns a single execution parameter or the default value when it's not set... """
+        return self.params.get(name, default)
+
+    @property
+    def apis_info(self):
+        """ Returns the list of API endpoints (params_api.json)... """
+        return self.read_json("params_api.json")
+
+    @property
+    def template_body(self):
+        """ Returns the request body used to get the credential XLS template (template_body.json)... """
+        return self.read_json("advancedcredential", "template_body.json")
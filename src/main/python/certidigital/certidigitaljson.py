@@ -0,0 +1,94 @@
+""" Pluggable JSON codec: uses orjson when it's installed and falls back to the standard json module... """
+import json
+import math
+import os
+import threading
+
+from .certidigitalexception import CertiDigitalException
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def _has_non_finite(obj):
+    """ Returns True when obj holds a NaN or infinite float at any depth... """
+    stack = [obj]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, float):
+            if not math.isfinite(value):
+                return True
+        elif isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+    return False
+
+
+class CertiDigitalJsonCodec:
+    """ JSON codec used for API responses and data files...
+        Decoding gives the same objects as the json module; when the fast backend rejects a document (NaN, huge integers...)
+        it's decoded again with the json module, so results and errors stay the same. Pretty-printed output is always produced
+        by the json module, the fast backend is only used for compact output, which decodes to the same data but isn't
+        byte-identical to the json module's (e.g. 1e16 instead of 1e+16). """
+
+    BACKENDS = ("auto", "orjson", "json")
+
+    __default = None
+    __default_lock = threading.Lock()
+
+    def __init__(self, backend=None):
+        backend = backend or os.environ.get("CERTIDIGITAL_JSON_BACKEND") or "auto"
+        if backend not in self.BACKENDS:
+            raise CertiDigitalException("Wrong JSON backend: " + str(backend))
+        if backend == "orjson" and orjson is None:
+            raise CertiDigitalException("JSON backend orjson is not installed")
+        self.__fast = orjson is not None and backend != "json"
+
+    @classmethod
+    def get_default(cls):
+        """ Returns the codec shared by the whole package... """
+        with cls.__default_lock:
+            if cls.__default is None:
+                cls.__default = cls()
+            return cls.__default
+
+    @classmethod
+    def set_default(cls, codec):
+        """ Replaces the shared codec (None resets it to the CERTIDIGITAL_JSON_BACKEND/automatic backend)... """
+        with cls.__default_lock:
+            cls.__default = codec
+
+    @property
+    def backend(self):
+        """ Returns the name of the backend in use... """
+        return "orjson" if self.__fast else "json"
+
+    def loads(self, data):
+        """ Decodes a JSON document from str or bytes... """
+        if self.__fast:
+            try:
+                return orjson.loads(data)
+            except orjson.JSONDecodeError:
+                pass
+        return json.loads(data)
+
+    def dumps(self, obj, indent=None):
+        """ Encodes obj as the json module does with default arguments (or with the given indent)... """
+        return json.dumps(obj, indent=indent)
+
+    def dumps_compact(self, obj):
+        """ Encodes obj as compact UTF-8 bytes (no whitespace, no ASCII escaping), for payloads read back by machines...
+            orjson writes NaN and Infinity as null, so objects holding them are encoded by the json module (NaN, Infinity). """
+        if self.__fast:
+            try:
+                data = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+            except (orjson.JSONEncodeError, TypeError):
+                pass
+            else:
+                # Only documents with nulls can hide a non-finite float, so the common case isn't walked...
+                if b"null" not in data or not _has_non_finite(obj):
+                    return data
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
@@ -1,28 +1,54 @@
 """ Main module to manage CertiDigital API operations. Includes the exposed methods... """
+import gzip
+import itertools
 import json
-from pathlib import Path
+from collections import deque, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+import requests
+import requests.adapters
 import requests.exceptions
 from requests_toolbelt import MultipartEncoder
 
+from .certidigitalblockstatus import CertiDigitalEmissionBlockStatus
+from .certidigitalconfig import CertiDigitalConfig
 from .certidigitalexception import CertiDigitalException
+from .certidigitaljson import CertiDigitalJsonCodec
+from .certidigitalprofiler import profiled_phase
+from .certidigitalupload import CertiDigitalUploadProgress
 from .certidigitalutil import CertiDigitalUtil
 
+CertiDigitalCredentialDetails = namedtuple("CertiDigitalCredentialDetails", ("uuid", "details", "raw_details", "pdf_response"))
+CertiDigitalCredentialDetails.__doc__ = """ Downloaded credential: parsed details (payload is the JSON-LD string), the raw details body and the PDF response (None when not requested)... """
+
 
 class CertiDigitalManager:
     """ Main class to manage CertiDigital API operations... """
 
-    def __init__(self):
-        self.__path_data = str(Path.home()) + "/PycharmProjects/CertiDigital.API.Sample/src/data"
-        util = CertiDigitalUtil()
-        self.__all_apis_info = util.read_data_from_json(self.__path_data + "/params_api.json", "r")
+    def __init__(self, config=None, session=None):
+        self.__config = config or CertiDigitalConfig.get_default()
+        self.__session = session or requests.Session()
+
+    @staticmethod
+    def create_session(pool_size=10):
+        """ Creates an HTTP session whose connection pool can be shared by several managers/threads... """
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    @property
+    def config(self):
+        """ Returns the configuration used by this manager... """
+        return self.__config
 
     def get_token_from_api(self, client_id, client_secret, username, password, token_url):
         """ Gets the token from the API to be used in subsequent session calls... """
         try:
             payload = {'grant_type': 'password', 'username': username, 'password': password, 'scope': 'openid'}
-            response = requests.post(token_url, data=payload, auth=(client_id, client_secret), timeout=300)
+            response = self.__session.post(token_url, data=payload, auth=(client_id, client_secret), timeout=300)
             response.raise_for_status()
-            return response.json()
+            return self.decode_json_response(response)
         except requests.exceptions.RequestException as e:
             raise CertiDigitalException("Error invoking to obtain the token") from e
 
@@ -30,21 +56,33 @@ class CertiDigitalManager:
         """ Gets logged out from the API... """
         try:
             payload = {'client_id': client_id, "client_secret": client_secret, "refresh_token": token}
-            response = requests.post(logout_url, params=payload, timeout=300)
+            response = self.__session.post(logout_url, params=payload, timeout=300)
             response.raise_for_status()
             return str(response.status_code)
         except requests.exceptions.RequestException as e:
             raise CertiDigitalException("Error invoking to logout from the API: " + str(response.status_code)) from e
 
+    @staticmethod
+    def decode_json_response(response):
+        """ Decodes the JSON body of a response with the package codec (same result and errors as response.json())... """
+        try:
+            if response.encoding and response.encoding.lower().replace("-", "") != "utf8":
+                return CertiDigitalJsonCodec.get_default().loads(response.text)
+            return CertiDigitalJsonCodec.get_default().loads(response.content)
+        except json.JSONDecodeError as e:
+            raise requests.exceptions.JSONDecodeError(e.msg, e.doc, e.pos) from e
+        except UnicodeDecodeError as e:
+            raise requests.exceptions.JSONDecodeError(e.reason, e.object.decode("utf-8", errors="replace"), e.start) from e
+
     def call_get_api(self, api_url, api_params, api_data, token, no_json=False):
         """ Makes a post API call, to the url passed as a parameter and using the data and token provided... """
         try:
             api_call_headers = {'authorization': 'Bearer ' + token, 'accept': 'application/json', 'content-Type': 'application/json'}
-            api_call_response = requests.get(api_url, params=api_params, json=api_data, headers=api_call_headers, timeout=30)
+            api_call_response = self.__session.get(api_url, params=api_params, json=api_data, headers=api_call_headers, timeout=30)
             api_call_response.raise_for_status()
             if no_json:
                 return api_call_response
-            return api_call_response.json()
+            return self.decode_json_response(api_call_response)
         except requests.exceptions.RequestException as e:
             print("Error: " + api_call_response.text)
             raise CertiDigitalException(f"Error calling get API: {e}") from e
@@ -60,23 +98,45 @@ class CertiDigitalManager:
                 content_type = content
             api_call_headers = {'authorization': 'Bearer ' + token, 'accept': accept_header, 'Content-Type': content_type}
             print("Headers: " + str(api_call_headers))
-            if content_type == 'application/json':
-                api_call_response = requests.post(api_url, params=api_params, json=api_data, headers=api_call_headers, timeout=3600)
+            compressed_body = self.__get_compressed_json_body(api_data) if content_type == 'application/json' else None
+            if compressed_body is not None:
+                api_call_headers['Content-Encoding'] = 'gzip'
+                api_call_response = self.__session.post(api_url, params=api_params, data=compressed_body, headers=api_call_headers, timeout=3600)
+            elif content_type == 'application/json':
+                api_call_response = self.__session.post(api_url, params=api_params, json=api_data, headers=api_call_headers, timeout=3600)
             else:
-                api_call_response = requests.post(api_url, params=api_params, data=api_data, headers=api_call_headers, timeout=3600)
+                api_call_response = self.__session.post(api_url, params=api_params, data=api_data, headers=api_call_headers, timeout=3600)
             api_call_response.raise_for_status()
             if accept_header == 'application/json':
-                return api_call_response.json()
+                return self.decode_json_response(api_call_response)
             return api_call_response
         except requests.exceptions.RequestException as e:
             print("Error: " + api_call_response.text)
             raise CertiDigitalException(f"Error calling post API: {e}") from e
 
+    def __get_compressed_json_body(self, api_data):
+        """ Returns the gzipped JSON body when it's larger than gzip_request_min_bytes (only for servers accepting Content-Encoding: gzip), None otherwise... """
+        min_bytes = self.__config.get_param("gzip_request_min_bytes", 0)
+        if not min_bytes or api_data in ('', None):
+            return None
+        body = json.dumps(api_data, allow_nan=False).encode('utf-8')
+        if len(body) < min_bytes:
+            return None
+        return gzip.compress(body, compresslevel=6)
+
+    def __get_upload_body(self, name, multipart_data, progress_callback):
+        """ Returns the multipart body to send, wrapped with progress/throughput telemetry when a callback is given or upload_progress is set... """
+        if progress_callback is None and self.__config.get_param("upload_progress", False):
+            progress_callback = CertiDigitalUploadProgress.print_progress
+        if progress_callback is None:
+            return multipart_data
+        return CertiDigitalUploadProgress(name, progress_callback).monitor(multipart_data)
+
     def call_delete_api(self, api_url, api_params, api_data, token):
         """ Makes a delete API call, to the url passed as a parameter and using the data and token provided... """
         try:
             api_call_headers = {'authorization': 'Bearer ' + token, 'accept': 'application/json', 'content-Type': 'application/json'}
-            api_call_response = requests.delete(api_url, params=api_params, json=api_data, headers=api_call_headers, timeout=30)
+            api_call_response = self.__session.delete(api_url, params=api_params, json=api_data, headers=api_call_headers, timeout=30)
             api_call_response.raise_for_status()
             return str(api_call_response.status_code)
         except requests.exceptions.RequestException:
@@ -85,44 +145,44 @@ class CertiDigitalManager:
 
     def get_all_users_info(self, token):
         """ Gets all users info... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "getUsers")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "getUsers")
         json_response = self.call_get_api(api_info["apiUrl"], "", "", token)
         return json_response
 
     def get_working_user_info(self, token):
         """ Gets working user info... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "getUserInfo")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "getUserInfo")
         json_response = self.call_get_api(api_info["apiUrl"], "", "", token)
         return json_response
 
     def get_issuing_center_info(self, token):
         """ Gets issuing centers info... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "getIssuingCentersInfo")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "getIssuingCentersInfo")
         json_response = self.call_get_api(api_info["apiUrl"], "", "", token)
         return json_response
 
     def get_organizations_info(self, token):
         """ Gets organizations info... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "getOrganizationsInfo")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "getOrganizationsInfo")
         json_response = self.call_get_api(api_info["apiUrl"], "", "", token)
         return json_response
 
     def create_new_activity(self, issuing_center_id, request_body, token):
         """ Creates a new activity in the issuing center based on request body parameters... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createActivity")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createActivity")
         api_params = "issuingCenterId=" + str(issuing_center_id)
         json_response = self.call_post_api(api_info["apiUrl"], '', '', api_params, request_body, token)
         return json_response
 
     def delete_activity(self, activity_id, token):
         """ Deletes an unused activity... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "deleteActivity")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "deleteActivity")
         print("Deleting activity with id: " + str(activity_id))
         json_response = self.call_delete_api(api_info["apiUrl"] + "/" + str(activity_id), "", "", token)
         print("Deleted activity (response code: " + json_response + ")")
@@ -130,8 +190,8 @@ class CertiDigitalManager:
 
     def rel_organization_to_activity(self, issuing_center_id, activity_id, organization_id, token):
         """ Relates am organization with an activity... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createActivity")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createActivity")
         api_url = api_info["apiUrl"] + "/" + str(activity_id) + "/awardingBody"
         api_params = "issuingCenterId=" + str(issuing_center_id)
         request_body = {"oid": [organization_id], "singleOid": organization_id}
@@ -141,16 +201,16 @@ class CertiDigitalManager:
 
     def create_new_credential(self, issuing_center_id, request_body, token):
         """ Creates a new credential in the issuing center based on request body parameters... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createCredential")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createCredential")
         api_params = "issuingCenterId=" + str(issuing_center_id)
         json_response = self.call_post_api(api_info["apiUrl"], '', '', api_params, request_body, token)
         return json_response
 
     def delete_credential(self, credential_id, token):
         """ Deletes an unused credential... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "deleteCredential")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "deleteCredential")
         print("Deleting credential with id: " + str(credential_id))
         json_response = self.call_delete_api(api_info["apiUrl"] + "/" + str(credential_id), "", "", token)
         print("Deleted credential (response code: " + json_response + ")")
@@ -158,8 +218,8 @@ class CertiDigitalManager:
 
     def rel_diploma_to_credential(self, issuing_center_id, credential_id, diploma_id, token):
         """ Relates a diploma to a credential... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createCredential")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createCredential")
         api_url = api_info["apiUrl"] + "/" + str(credential_id) + "/diploma"
         api_params = "issuingCenterId=" + str(issuing_center_id)
         request_body = {"oid": [diploma_id], "singleOid": diploma_id}
@@ -169,8 +229,8 @@ class CertiDigitalManager:
 
     def rel_achievement_to_credential(self, issuing_center_id, credential_id, achievement_id, token):
         """ Relates an achievement to a credential... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createCredential")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createCredential")
         api_url = api_info["apiUrl"] + "/" + str(credential_id) + "/achieved"
         api_params = "issuingCenterId=" + str(issuing_center_id)
         request_body = {"oid": [achievement_id], "singleOid": achievement_id}
@@ -180,22 +240,22 @@ class CertiDigitalManager:
 
     def get_credential_template(self, issuing_center_id, credential_id, token):
         """ Calls API to gather the credential XLS template to fill with credential recipients... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createCredential")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createCredential")
         api_url = api_info["apiUrl"] + "/" + str(credential_id) + "/recipients/templates"
         api_params = {"issuingCenterId": str(issuing_center_id), "locale": "es"}
-        util = CertiDigitalUtil()
-        base_template_json = util.read_data_from_json(self.__path_data + "/advancedcredential/template_body.json", "r")
-        request_body = base_template_json
+        request_body = self.__config.template_body
         print("RB: " + str(request_body))
         print("Getting credential XLS template for credential: " + str(credential_id))
         json_response = self.call_post_api(api_url, 'application/octet-stream', '', api_params, request_body, token)
         return json_response
 
-    def credentials_issue_through_template(self, issuing_center_id, credential_id, token, file_name, alias, block_id):
-        """ Calls API to issue the credentials through an XLS template already filled with the recipients... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createCredential")
+    @profiled_phase("issue")
+    def credentials_issue_through_template(self, issuing_center_id, credential_id, token, file_name, alias, block_id, progress_callback=None):
+        """ Calls API to issue the credentials through an XLS template already filled with the recipients...
+            The file is streamed from disk; progress_callback (see CertiDigitalUploadProgress) receives the upload progress. """
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createCredential")
         api_url = api_info["apiUrl"] + "/" + str(credential_id) + "/issue/templates"
         api_params = "issuingCenterId=" + str(issuing_center_id)
         api_params = api_params + "&alias=" + alias
@@ -208,55 +268,152 @@ class CertiDigitalManager:
                     'file': (file_name, file, 'application/vnd.ms-excel')
                 }
             )
-            json_response = self.call_post_api(api_url, 'application/json', multipart_data.content_type, api_params, multipart_data, token)
+            upload_body = self.__get_upload_body(file_name, multipart_data, progress_callback)
+            json_response = self.call_post_api(api_url, 'application/json', multipart_data.content_type, api_params, upload_body, token)
             return json_response
 
+    @profiled_phase("poll")
     def get_emissions_block_data(self, emissions_block_id, token):
         """ Gets the detailed info associated with an emission block... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "getEmissionsBlockData")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "getEmissionsBlockData")
         api_url = api_info["apiUrl"] + "/" + str(emissions_block_id)
         json_response = self.call_get_api(api_url, "", "", token)
         return json_response
 
+    @profiled_phase("poll")
+    def get_emissions_block_status(self, emissions_block_id, token, api_params=None):
+        """ Lightweight version of get_emissions_block_data for polling: the response is parsed while it's downloaded and only
+            the uuid and stateId of each emission are kept. api_params are forwarded (paging or state filters, when the API supports them)... """
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "getEmissionsBlockData")
+        api_url = api_info["apiUrl"] + "/" + str(emissions_block_id)
+        try:
+            api_call_headers = {'authorization': 'Bearer ' + token, 'accept': 'application/json'}
+            with self.__session.get(api_url, params=api_params or "", headers=api_call_headers, timeout=30, stream=True) as api_call_response:
+                api_call_response.raise_for_status()
+                return CertiDigitalEmissionBlockStatus.from_chunks(api_call_response.iter_content(chunk_size=65536))
+        except requests.exceptions.RequestException as e:
+            raise CertiDigitalException(f"Error calling get API: {e}") from e
+
+    @profiled_phase("seal")
     def seal_credentials(self, issuing_center_id, uuids_list, token):
         """ Tries to seal the identified credential list of uuids... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "emissionsSeal")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "emissionsSeal")
         api_url = api_info["apiUrl"]
         api_params = ''
         request_body = {'uuidList': uuids_list, 'issuingCenterId': issuing_center_id}
         json_response = self.call_post_api(api_url, '', '', api_params, request_body, token)
         return json_response
 
-    def get_credential_details(self, uuid, token):
-        """ Returns the credential details including the jsonld file... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "emissionsDetails")
+    @profiled_phase("download")
+    def get_credential_details(self, uuid, token, raw=False):
+        """ Returns the credential details including the jsonld file...
+            With raw=True returns the JSON body sent by the API instead (to be parsed and sent to the wallet without re-serializing it). """
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "emissionsDetails")
         api_url = api_info["apiUrl"] + "/" + str(uuid)
         api_params = ""
+        if raw:
+            return self.call_get_api(api_url, api_params, "", token, no_json=True).content
         json_response = self.call_get_api(api_url, api_params, "", token)
         return json_response
 
-    def get_credential_pdf(self, jsonld_bytes, token):
-        """ Returns the PDF associated to a credential... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "walletGetPDF")
+    def __download_credential(self, uuid, token, with_pdf, locale, pdf_type):
+        """ Downloads the details of a credential, parsed once, and optionally its PDF rendered from the same raw bytes... """
+        raw_details = self.get_credential_details(uuid, token, raw=True)
+        details = CertiDigitalJsonCodec.get_default().loads(raw_details)
+        pdf_response = None
+        if with_pdf:
+            payload = details.get("payload") if isinstance(details, dict) else None
+            pdf_response = self.__get_credential_pdf(raw_details, payload, token, None, locale, pdf_type)
+        return CertiDigitalCredentialDetails(uuid, details, raw_details, pdf_response)
+
+    def iter_credentials_details(self, uuids, token, max_workers=None, with_pdf=False, locale="es", pdf_type="diploma"):
+        """ Downloads the details (and PDFs when with_pdf is set) of many credentials concurrently, yielding CertiDigitalCredentialDetails in the uuids order...
+            At most 2 * max_workers credentials are in flight or waiting to be consumed, so memory doesn't grow with the number of uuids.
+            Arguments are checked on the call, before the first credential is requested. """
+        if max_workers is None:
+            max_workers = self.__config.get_param("max_concurrent_downloads", 8)
+        max_workers = int(max_workers)
+        if max_workers < 1:
+            raise CertiDigitalException("max_workers must be >= 1")
+        return self.__iter_credentials_details(iter(uuids), token, max_workers, with_pdf, locale, pdf_type)
+
+    def __iter_credentials_details(self, uuids, token, max_workers, with_pdf, locale, pdf_type):
+        """ Generator behind iter_credentials_details, keeping the queue of downloads bounded... """
+        pending = deque()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="certidigital-download") as executor:
+            try:
+                for uuid in itertools.islice(uuids, 2 * max_workers):
+                    pending.append(executor.submit(self.__download_credential, uuid, token, with_pdf, locale, pdf_type))
+                while pending:
+                    credential = pending.popleft().result()
+                    for uuid in itertools.islice(uuids, 1):
+                        pending.append(executor.submit(self.__download_credential, uuid, token, with_pdf, locale, pdf_type))
+                    yield credential
+            finally:
+                for future in pending:
+                    future.cancel()
+
+    def get_credential_pdf(self, jsonld_bytes, token, progress_callback=None, locale="es", pdf_type="diploma"):
+        """ Returns the PDF associated to a credential...
+            jsonld_bytes can be the credential details (dict, serialized here) or its already serialized JSON (bytes/str, sent without copies).
+            When pdf_cache_dir is set, renders of the same credential payload, locale and PDF type are served from the local cache. """
+        payload = None
+        if self.__config.pdf_cache is not None:
+            details = jsonld_bytes
+            if isinstance(details, (bytes, str)):
+                try:
+                    details = CertiDigitalJsonCodec.get_default().loads(details)
+                except ValueError:
+                    details = None
+            payload = details.get("payload") if isinstance(details, dict) else None
+        return self.__get_credential_pdf(jsonld_bytes, payload, token, progress_callback, locale, pdf_type)
+
+    @profiled_phase("download")
+    def __get_credential_pdf(self, jsonld_bytes, payload, token, progress_callback, locale, pdf_type):
+        """ Renders the credential in the wallet, using the cache when there's one and the credential payload is known... """
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "walletGetPDF")
         api_url = api_info["apiUrl"]
-        api_params = 'locale=es&pdfType=diploma'
+        api_params = {'locale': locale, 'pdfType': pdf_type}
+        if not isinstance(jsonld_bytes, (bytes, str)):
+            jsonld_bytes = json.dumps(jsonld_bytes).encode('utf-8')
+        pdf_cache = self.__config.pdf_cache
+        cache_key = pdf_cache.get_key(payload, locale, pdf_type) if pdf_cache is not None and payload is not None else None
+        if cache_key is not None:
+            cached_pdf = pdf_cache.get(cache_key)
+            if cached_pdf is not None:
+                return self.__get_cached_response(api_url, cached_pdf)
         multipart_data = MultipartEncoder(
             fields={
-                'file': ("blob", json.dumps(jsonld_bytes), 'text/xml')
+                'file': ("blob", jsonld_bytes, 'text/xml')
             }
         )
-        pdf_response = self.call_post_api(api_url, 'application/pdf', multipart_data.content_type, api_params, multipart_data, token)
+        upload_body = self.__get_upload_body("credential PDF", multipart_data, progress_callback)
+        pdf_response = self.call_post_api(api_url, 'application/pdf', multipart_data.content_type, api_params, upload_body, token)
         #json_response = self.call_post_api(api_url, 'application/pdf', 'multipart/form-data; boundary=----WebKitFormBoundaryUNOIBs14BDclB761', api_params, request_body, token)
+        if cache_key is not None and pdf_response.status_code == 200:
+            pdf_cache.put(cache_key, pdf_response.content)
         return pdf_response
 
+    @staticmethod
+    def __get_cached_response(api_url, content):
+        """ Returns a cached PDF as the response the wallet would have sent... """
+        response = requests.Response()
+        response.status_code = 200
+        response.url = api_url
+        response.headers['Content-Type'] = 'application/pdf'
+        response.headers['X-CertiDigital-Cache'] = 'hit'
+        response._content = content  # pylint: disable=protected-access
+        return response
+
     def send_credentials(self, uuids_list, token):
         """ Send email to the identified credential list of uuids... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "emissionsSend")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "emissionsSend")
         api_url = api_info["apiUrl"]
         api_params = ''
         request_body = {'uuidList': uuids_list}
@@ -266,8 +423,8 @@ class CertiDigitalManager:
 
     def send_credentials_to_euwallet(self, issuing_center_id, uuids_list, token):
         """ Send email to the identified credential list of uuids... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "emissionsSendEUWallet")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "emissionsSendEUWallet")
         api_url = api_info["apiUrl"]
         for uuid in uuids_list:
             api_params = {"id": str(issuing_center_id), "uuid": "es"}
@@ -279,16 +436,16 @@ class CertiDigitalManager:
 
     def create_new_assessment(self, issuing_center_id, request_body, token):
         """ Creates a new assessment in the issuing center based on request body parameters... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createAssessment")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createAssessment")
         api_params = "issuingCenterId=" + str(issuing_center_id)
         json_response = self.call_post_api(api_info["apiUrl"], '', '', api_params, request_body, token)
         return json_response
 
     def delete_assessment(self, assessment_id, token):
         """ Deletes an unused assessment... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "deleteAssessment")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "deleteAssessment")
         print("Deleting assessment with id: " + str(assessment_id))
         json_response = self.call_delete_api(api_info["apiUrl"] + "/" + str(assessment_id), "", "", token)
         print("Deleted assessment (response code: " + json_response + ")")
@@ -296,8 +453,8 @@ class CertiDigitalManager:
 
     def rel_organization_to_assessment(self, issuing_center_id, assessment_id, organization_id, token):
         """ Relates am organization with an assessment... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createAssessment")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createAssessment")
         api_url = api_info["apiUrl"] + "/" + str(assessment_id) + "/awardingBody"
         api_params = "issuingCenterId=" + str(issuing_center_id)
         request_body = {"oid": [organization_id], "singleOid": organization_id}
@@ -307,16 +464,16 @@ class CertiDigitalManager:
 
     def create_new_learning_outcome(self, issuing_center_id, request_body, token):
         """ Creates a new learning outcome in the issuing center based on request body parameters... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createLearningOutcome")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createLearningOutcome")
         api_params = "issuingCenterId=" + str(issuing_center_id)
         json_response = self.call_post_api(api_info["apiUrl"], '', '', api_params, request_body, token)
         return json_response
 
     def delete_learning_outcome(self, learning_outcome_id, token):
         """ Deletes an unused assessment... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "deleteLearningOutcome")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "deleteLearningOutcome")
         print("Deleting learning outcome with id: " + str(learning_outcome_id))
         json_response = self.call_delete_api(api_info["apiUrl"] + "/" + str(learning_outcome_id), "", "", token)
         print("Deleted learning outcome (response code: " + json_response + ")")
@@ -324,16 +481,16 @@ class CertiDigitalManager:
 
     def create_new_achievement(self, issuing_center_id, request_body, token):
         """ Creates a new achievement in the issuing center based on request body parameters... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createAchievement")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createAchievement")
         api_params = "issuingCenterId=" + str(issuing_center_id)
         json_response = self.call_post_api(api_info["apiUrl"], '', '', api_params, request_body, token)
         return json_response
 
     def delete_achievement(self, achievement_id, token):
         """ Deletes an achievement... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "deleteAchievement")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "deleteAchievement")
         print("Deleting achievement with id: " + str(achievement_id))
         json_response = self.call_delete_api(api_info["apiUrl"] + "/" + str(achievement_id), "", "", token)
         print("Deleted achievement (response code: " + json_response + ")")
@@ -341,8 +498,8 @@ class CertiDigitalManager:
 
     def rel_assessment_to_achievement(self, issuing_center_id, achievement_id, assessment_id, token):
         """ Relates am organization with an activity... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createAchievement")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createAchievement")
         api_url = api_info["apiUrl"] + "/" + str(achievement_id) + "/provenBy"
         api_params = "issuingCenterId=" + str(issuing_center_id)
         request_body = {"oid": [assessment_id], "singleOid": assessment_id}
@@ -352,8 +509,8 @@ class CertiDigitalManager:
 
     def rel_learning_outcome_to_achievement(self, issuing_center_id, achievement_id, learning_outcome_ids, token):
         """ Relates some learning outcomes with an achievement... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createAchievement")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createAchievement")
         api_url = api_info["apiUrl"] + "/" + str(achievement_id) + "/learningOutcomes"
         api_params = "issuingCenterId=" + str(issuing_center_id)
         request_body = {"oid": learning_outcome_ids, "singleOid": 0}
@@ -363,8 +520,8 @@ class CertiDigitalManager:
 
     def rel_activities_to_achievement(self, issuing_center_id, achievement_id, activities_ids, token):
         """ Relates some activities with an achievement... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createAchievement")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createAchievement")
         api_url = api_info["apiUrl"] + "/" + str(achievement_id) + "/influencedBy"
         api_params = "issuingCenterId=" + str(issuing_center_id)
         request_body = {"oid": activities_ids, "singleOid": 0}
@@ -374,8 +531,8 @@ class CertiDigitalManager:
 
     def rel_organization_to_achievement(self, issuing_center_id, achievement_id, organization_id, token):
         """ Relates some organization with an achievement... """
-        util = CertiDigitalUtil()
-        api_info = util.get_api_info(self.__all_apis_info, "createAchievement")
+        util = CertiDigitalUtil(self.__config)
+        api_info = util.get_api_info(self.__config.apis_info, "createAchievement")
         api_url = api_info["apiUrl"] + "/" + str(achievement_id) + "/awardingBody"
         api_params = "issuingCenterId=" + str(issuing_center_id)
         request_body = {"oid": [organization_id], "singleOid": organization_id}
@@ -0,0 +1,208 @@
+""" Output sinks for the downloaded credentials (JSON-LD and PDF artifacts)... """
+import abc
+import gzip
+import io
+import json
+import os
+import tarfile
+import threading
+import time
+import zipfile
+from pathlib import Path
+
+from .certidigitalconfig import CertiDigitalConfig
+from .certidigitalexception import CertiDigitalException
+from .certidigitaljson import CertiDigitalJsonCodec
+
+
+class CertiDigitalOutputSink(abc.ABC):
+    """ Base class of the credential output sinks. Use create() to get the sink configured in params.json... """
+
+    OUTPUT_FORMATS = ("files", "zip", "tar", "jsonl.gz")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    @staticmethod
+    def create(config=None, output_format=None):
+        """ Returns the sink for the output_format parameter: files (one file per artifact), zip, tar or jsonl.gz (sharded archives)... """
+        config = config or CertiDigitalConfig.get_default()
+        output_format = output_format or config.get_param("output_format", "files")
+        if output_format not in CertiDigitalOutputSink.OUTPUT_FORMATS:
+            raise CertiDigitalException("Wrong output format: " + str(output_format))
+        if output_format == "files":
+            return CertiDigitalFileSink(config.path_output, indent=config.get_param("output_indent", None))
+        archive_format = "zip" if output_format == "jsonl.gz" else output_format
+        return CertiDigitalArchiveSink(config.path_output, archive_format=archive_format, jsonl=output_format == "jsonl.gz",
+                                       shard_size=config.get_param("output_shard_size", 10000))
+
+    @staticmethod
+    def jsonld_to_bytes(jsonld_data, indent=None):
+        """ Returns the JSON-LD as UTF-8 bytes. Raw payloads (str/bytes) are kept as they are unless an indent is requested... """
+        if isinstance(jsonld_data, (bytes, bytearray, memoryview)):
+            if indent is None:
+                return bytes(jsonld_data)
+            jsonld_data = json.loads(jsonld_data)
+        elif isinstance(jsonld_data, str):
+            if indent is None:
+                return jsonld_data.encode("utf-8")
+            jsonld_data = json.loads(jsonld_data)
+        # The json module is used for parsed documents, so the written credentials keep its exact number formatting...
+        separators = (",", ":") if indent is None else None
+        return json.dumps(jsonld_data, indent=indent, separators=separators, ensure_ascii=False).encode("utf-8")
+
+    @abc.abstractmethod
+    def write_jsonld(self, uuid, jsonld_data):
+        """ Stores the JSON-LD of a credential (dict, str or bytes)... """
+
+    @abc.abstractmethod
+    def write_pdf(self, uuid, pdf_bytes):
+        """ Stores the PDF of a credential... """
+
+    def close(self):
+        """ Flushes and closes the sink... """
+
+
+class CertiDigitalFileSink(CertiDigitalOutputSink):
+    """ Writes <uuid>.jsonld and <uuid>.pdf files into the output folder (compact JSON unless an indent is given)... """
+
+    def __init__(self, path_output, indent=None):
+        self.__path_output = str(path_output)
+        self.__indent = indent
+        os.makedirs(self.__path_output, exist_ok=True)
+
+    def write_jsonld(self, uuid, jsonld_data):
+        """ Writes <uuid>.jsonld... """
+        with open(self.__path_output + "/" + uuid + ".jsonld", "wb") as jld_file:
+            jld_file.write(self.jsonld_to_bytes(jsonld_data, self.__indent))
+
+    def write_pdf(self, uuid, pdf_bytes):
+        """ Writes <uuid>.pdf... """
+        with open(self.__path_output + "/" + uuid + ".pdf", "wb") as pdf_file:
+            pdf_file.write(pdf_bytes)
+
+
+class CertiDigitalArchiveSink(CertiDigitalOutputSink):
+    """ Streams the artifacts into sharded archives (<prefix>_NNNNN.zip or .tar.gz) with an index (<prefix>_index.jsonl) for uuid lookup...
+        With jsonl=True the JSON-LD documents go one per line to <prefix>_NNNNN.jsonl.gz and only the PDFs to the archive. """
+
+    def __init__(self, path_output, archive_format="zip", jsonl=False, shard_size=10000, prefix="credentials"):
+        if archive_format not in ("zip", "tar"):
+            raise CertiDigitalException("Wrong archive format: " + str(archive_format))
+        if shard_size < 1:
+            raise CertiDigitalException("Output shard size must be >= 1")
+        self.__path_output = Path(path_output)
+        self.__archive_format = archive_format
+        self.__jsonl = jsonl
+        self.__shard_size = shard_size
+        self.__prefix = prefix
+        self.__lock = threading.Lock()
+        self.__shard = {"index": 0, "uuids": set(), "archive": None, "archive_name": None, "jsonl_file": None, "jsonl_name": None, "jsonl_line": 0}
+        os.makedirs(self.__path_output, exist_ok=True)
+        self.__index_file = open(self.__path_output / (prefix + "_index.jsonl"), "a", encoding="utf-8")  # pylint: disable=consider-using-with
+
+    def __close_shard(self):
+        """ Closes the files of the current shard... """
+        shard = self.__shard
+        if shard["archive"] is not None:
+            shard["archive"].close()
+            shard["archive"] = None
+        if shard["jsonl_file"] is not None:
+            shard["jsonl_file"].close()
+            shard["jsonl_file"] = None
+        shard["uuids"] = set()
+
+    def __get_shard(self, uuid):
+        """ Opens a new shard when the current one is full (all the artifacts of a credential go to the same shard)... """
+        shard = self.__shard
+        if uuid in shard["uuids"]:
+            return
+        if shard["archive"] is None or len(shard["uuids"]) >= self.__shard_size:
+            self.__close_shard()
+            shard["index"] += 1
+            shard_name = f"{self.__prefix}_{shard['index']:05d}"
+            while any(self.__path_output.glob(shard_name + ".*")):
+                shard["index"] += 1
+                shard_name = f"{self.__prefix}_{shard['index']:05d}"
+            if self.__archive_format == "zip":
+                shard["archive_name"] = shard_name + ".zip"
+                shard["archive"] = zipfile.ZipFile(self.__path_output / shard["archive_name"], "w", compression=zipfile.ZIP_DEFLATED)  # pylint: disable=consider-using-with
+            else:
+                shard["archive_name"] = shard_name + ".tar.gz"
+                shard["archive"] = tarfile.open(self.__path_output / shard["archive_name"], "w:gz")  # pylint: disable=consider-using-with
+            if self.__jsonl:
+                shard["jsonl_name"] = shard_name + ".jsonl.gz"
+                shard["jsonl_file"] = gzip.open(self.__path_output / shard["jsonl_name"], "wb")
+                shard["jsonl_line"] = 0
+        shard["uuids"].add(uuid)
+
+    def __add_member(self, member_name, data, compress):
+        """ Adds a file to the current archive (PDFs are stored, they don't compress)... """
+        if self.__archive_format == "zip":
+            self.__shard["archive"].writestr(member_name, data, compress_type=zipfile.ZIP_DEFLATED if compress else zipfile.ZIP_STORED)
+        else:
+            member = tarfile.TarInfo(member_name)
+            member.size = len(data)
+            member.mtime = int(time.time())
+            self.__shard["archive"].addfile(member, io.BytesIO(data))
+
+    def __add_index_entry(self, entry):
+        """ Appends an entry to the uuid index... """
+        self.__index_file.write(CertiDigitalJsonCodec.get_default().dumps_compact(entry).decode("utf-8") + "\n")
+
+    def write_jsonld(self, uuid, jsonld_data):
+        """ Adds the JSON-LD to the current shard (archive member or jsonl.gz line)... """
+        data = self.jsonld_to_bytes(jsonld_data)
+        with self.__lock:
+            self.__get_shard(uuid)
+            shard = self.__shard
+            if self.__jsonl:
+                shard["jsonl_file"].write(data.replace(b"\n", b" ") + b"\n")
+                self.__add_index_entry({"uuid": uuid, "type": "jsonld", "shard": shard["jsonl_name"], "line": shard["jsonl_line"]})
+                shard["jsonl_line"] += 1
+            else:
+                self.__add_member(uuid + ".jsonld", data, True)
+                self.__add_index_entry({"uuid": uuid, "type": "jsonld", "shard": shard["archive_name"], "member": uuid + ".jsonld"})
+
+    def write_pdf(self, uuid, pdf_bytes):
+        """ Adds the PDF to the current shard archive... """
+        with self.__lock:
+            self.__get_shard(uuid)
+            self.__add_member(uuid + ".pdf", bytes(pdf_bytes), False)
+            self.__add_index_entry({"uuid": uuid, "type": "pdf", "shard": self.__shard["archive_name"], "member": uuid + ".pdf"})
+
+    def close(self):
+        """ Closes the current shard and the index... """
+        with self.__lock:
+            self.__close_shard()
+            if not self.__index_file.closed:
+                self.__index_file.close()
+
+    @staticmethod
+    def load_index(path_output, prefix="credentials"):
+        """ Returns the index as {uuid: {type: entry}}... """
+        index = {}
+        with open(Path(path_output) / (prefix + "_index.jsonl"), encoding="utf-8") as index_file:
+            for line in index_file:
+                entry = CertiDigitalJsonCodec.get_default().loads(line)
+                index.setdefault(entry["uuid"], {})[entry["type"]] = entry
+        return index
+
+    @staticmethod
+    def read_artifact(path_output, entry):
+        """ Returns the bytes of the artifact described by an index entry... """
+        shard = Path(path_output) / entry["shard"]
+        if "line" in entry:
+            with gzip.open(shard, "rb") as jsonl_file:
+                for line_num, line in enumerate(jsonl_file):
+                    if line_num == entry["line"]:
+                        return line.rstrip(b"\n")
+            raise CertiDigitalException("Credential not found in " + entry["shard"])
+        if entry["shard"].endswith(".zip"):
+            with zipfile.ZipFile(shard) as archive:
+                return archive.read(entry["member"])
+        with tarfile.open(shard, "r:gz") as archive:
+            return archive.extractfile(entry["member"]).read()
@@ -0,0 +1,137 @@
+""" On-disk cache of the credential PDFs rendered by the wallet, addressed by the content they were rendered from... """
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+
+
+class CertiDigitalPdfCache:
+    """ Content-addressed PDF cache: the key is the SHA-256 of the rendering options and the credential payload (the signed
+        credential inside the details sent to the wallet), so a changed credential is a new entry and an old one is never served for it,
+        while changes in the rest of the details (status, dates...) still hit the cache.
+        Total size is bounded by max_bytes, evicting the least recently used PDFs (recency survives restarts through the file mtime).
+        Several processes can share the folder; the size limit is only enforced by each one over the entries it knows about. """
+
+    SUFFIX = ".pdf"
+
+    def __init__(self, path_cache, max_bytes=1073741824):
+        self.__path_cache = str(path_cache)
+        self.__max_bytes = int(max_bytes)
+        self.__entries = None
+        self.__size = 0
+        self.__lock = threading.Lock()
+
+    @property
+    def path_cache(self):
+        """ Returns the cache folder... """
+        return self.__path_cache
+
+    @property
+    def max_bytes(self):
+        """ Returns the size limit of the cache... """
+        return self.__max_bytes
+
+    @property
+    def size(self):
+        """ Returns the bytes currently used by the cached PDFs... """
+        with self.__lock:
+            self.__load()
+            return self.__size
+
+    @staticmethod
+    def get_key(payload, locale, pdf_type):
+        """ Returns the cache key of a render: hash of the locale, the PDF type and the credential payload (str, bytes or parsed JSON)... """
+        if not isinstance(payload, (bytes, str)):
+            payload = json.dumps(payload, sort_keys=True)
+        if isinstance(payload, str):
+            payload = payload.encode("utf-8")
+        digest = hashlib.sha256()
+        digest.update(f"{locale}\0{pdf_type}\0".encode("utf-8"))
+        digest.update(payload)
+        return digest.hexdigest()
+
+    def __get_file(self, key):
+        """ Returns the file of an entry (two-level folders keep directories small)... """
+        return os.path.join(self.__path_cache, key[:2], key + self.SUFFIX)
+
+    def __load(self):
+        """ Builds the LRU index from the cache folder the first time it's needed... """
+        if self.__entries is not None:
+            return
+        found = []
+        if os.path.isdir(self.__path_cache):
+            for folder in os.scandir(self.__path_cache):
+                if not folder.is_dir():
+                    continue
+                for entry in os.scandir(folder.path):
+                    if entry.name.endswith(self.SUFFIX):
+                        stat = entry.stat()
+                        found.append((stat.st_mtime_ns, entry.name[:-len(self.SUFFIX)], stat.st_size))
+        self.__entries = OrderedDict((key, size) for _, key, size in sorted(found))
+        self.__size = sum(self.__entries.values())
+        self.__evict()
+
+    def __evict(self, max_bytes=None):
+        """ Removes the least recently used PDFs until the cache fits in max_bytes... """
+        max_bytes = self.__max_bytes if max_bytes is None else max_bytes
+        while self.__entries and self.__size > max_bytes:
+            key, size = self.__entries.popitem(last=False)
+            self.__size -= size
+            try:
+                os.remove(self.__get_file(key))
+            except FileNotFoundError:
+                pass
+
+    def get(self, key):
+        """ Returns the cached PDF of the key (marking it as recently used) or None... """
+        file_name = self.__get_file(key)
+        with self.__lock:
+            self.__load()
+        # The file is read without the lock, so hits don't wait for each other; it's only taken to update the LRU index...
+        try:
+            with open(file_name, "rb") as f:
+                content = f.read()
+            os.utime(file_name)
+        except FileNotFoundError:
+            with self.__lock:
+                self.__size -= self.__entries.pop(key, 0)
+            return None
+        with self.__lock:
+            if key in self.__entries:
+                self.__entries.move_to_end(key)
+            elif os.path.exists(file_name):
+                # Written by another process (a PDF evicted meanwhile by this one is not indexed again)...
+                self.__entries[key] = len(content)
+                self.__size += len(content)
+                self.__evict()
+        return content
+
+    def put(self, key, content):
+        """ Stores a rendered PDF (written to a temporary file and renamed, so readers never see partial PDFs)... """
+        if len(content) > self.__max_bytes:
+            return False
+        with self.__lock:
+            self.__load()
+        file_name = self.__get_file(key)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(file_name), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(content)
+            os.replace(tmp_name, file_name)
+        except BaseException:
+            os.remove(tmp_name)
+            raise
+        with self.__lock:
+            self.__size += len(content) - self.__entries.pop(key, 0)
+            self.__entries[key] = len(content)
+            self.__evict()
+        return True
+
+    def clear(self):
+        """ Removes every cached PDF... """
+        with self.__lock:
+            self.__load()
+            self.__evict(0)
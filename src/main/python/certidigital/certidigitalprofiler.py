@@ -0,0 +1,146 @@
+""" Opt-in profiling of the emission pipeline phases (fill, split, issue, seal, poll, download)... """
+import contextlib
+import cProfile
+import functools
+import io
+import os
+import pstats
+import threading
+import time
+import tracemalloc
+
+_NULL_PHASE = contextlib.nullcontext()
+
+
+def profiled_phase(name):
+    """ Decorator for manager/util methods: profiles the call as the given phase when the profiler of self.config is enabled... """
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            profiler = self.config.profiler
+            if not profiler.enabled:
+                return method(self, *args, **kwargs)
+            with profiler.phase(name):
+                return method(self, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+class CertiDigitalProfiler:
+    """ Captures a CPU profile and the memory allocations of every phase and writes a summary report...
+        When disabled phase() returns a shared no-op context, so the instrumented code pays nothing else.
+        Only one thread is profiled at a time: phases entered concurrently by other threads only count calls and times.
+        Memory is traced (tracemalloc) only while a phase is profiled, which slows it down and is stopped afterwards unless it was
+        already running. The peak is measured on every call, but the allocations by line come from a snapshot of the first
+        snapshot_calls calls of each phase only, as a snapshot costs time proportional to the traced memory. """
+
+    def __init__(self, enabled=False, path_output=".", top=15, snapshot_calls=1):
+        self.__enabled = enabled
+        self.__path_output = str(path_output)
+        self.__top = top
+        self.__snapshot_calls = snapshot_calls
+        self.__phases = {}
+        self.__lock = threading.Lock()
+        self.__profiling = threading.Lock()
+
+    @property
+    def enabled(self):
+        """ Returns True when profiling is on... """
+        return self.__enabled
+
+    def phase(self, name):
+        """ Returns the context manager that profiles a phase (calls with the same name are aggregated)... """
+        if not self.__enabled:
+            return _NULL_PHASE
+        return self.__profile_phase(name)
+
+    def __get_phase(self, name):
+        """ Returns the accumulated data of a phase... """
+        with self.__lock:
+            if name not in self.__phases:
+                self.__phases[name] = {"calls": 0, "wall": 0.0, "cpu": 0.0, "peak": 0, "snapshots": 0, "profile": cProfile.Profile(), "allocations": {}}
+            return self.__phases[name]
+
+    @contextlib.contextmanager
+    def __profile_phase(self, name):
+        """ Profiles the phase when no other phase is being profiled, otherwise only measures its times... """
+        data = self.__get_phase(name)
+        # The profiling lock isn't reentrant, so a phase nested in a profiled one (same thread) is only timed as well...
+        profiled = self.__profiling.acquire(blocking=False)
+        if profiled:
+            started_tracing = not tracemalloc.is_tracing()
+            if started_tracing:
+                tracemalloc.start()
+            with self.__lock:
+                sampled = data["snapshots"] < self.__snapshot_calls
+                if sampled:
+                    data["snapshots"] += 1
+            # When tracing starts here every trace belongs to the phase, so no snapshot is needed to tell them apart...
+            snapshot = tracemalloc.take_snapshot() if sampled and not started_tracing else None
+            tracemalloc.reset_peak()
+            memory_base = tracemalloc.get_traced_memory()[0]
+            data["profile"].enable()
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.thread_time() - start_cpu
+            if profiled:
+                data["profile"].disable()
+                data["peak"] = max(data["peak"], tracemalloc.get_traced_memory()[1] - memory_base)
+                if sampled:
+                    self.__add_allocations(data, snapshot)
+                if started_tracing:
+                    tracemalloc.stop()
+                self.__profiling.release()
+            with self.__lock:
+                data["calls"] += 1
+                data["wall"] += wall
+                data["cpu"] += cpu
+
+    @staticmethod
+    def __add_allocations(data, snapshot):
+        """ Accumulates the live allocations done during the phase (since the snapshot, when tracing was already running), by source line... """
+        filters = [tracemalloc.Filter(False, tracemalloc.__file__), tracemalloc.Filter(False, "<frozen importlib._bootstrap*>")]
+        current = tracemalloc.take_snapshot().filter_traces(filters)
+        if snapshot is None:
+            stats = [(stat.traceback, stat.size, stat.count) for stat in current.statistics("lineno")]
+        else:
+            stats = [(stat.traceback, stat.size_diff, stat.count_diff) for stat in current.compare_to(snapshot.filter_traces(filters), "lineno")]
+        for traceback, size_diff, count_diff in stats:
+            if size_diff > 0:
+                line = str(traceback[0])
+                size, count = data["allocations"].get(line, (0, 0))
+                data["allocations"][line] = (size + size_diff, count + count_diff)
+
+    def write_report(self, file_name=None):
+        """ Writes the summary report (times, top functions and allocations per phase) and a .prof file per phase... """
+        if not self.__enabled:
+            return None
+        os.makedirs(self.__path_output, exist_ok=True)
+        file_name = file_name or os.path.join(self.__path_output, "profiling_report.txt")
+        with self.__lock:
+            phases = dict(self.__phases)
+        with open(file_name, "w", encoding="UTF-8") as report:
+            report.write("Phase            Calls   Wall (s)    CPU (s)   Peak memory (MB)\n")
+            for name, data in phases.items():
+                report.write(f"{name:15s} {data['calls']:6d} {data['wall']:10.3f} {data['cpu']:10.3f} {data['peak'] / 1e6:18.2f}\n")
+            for name, data in phases.items():
+                report.write("\n======== Phase " + name + " ========\n")
+                stream = io.StringIO()
+                try:
+                    stats = pstats.Stats(data["profile"], stream=stream)
+                except TypeError:
+                    stream.write("No CPU profile captured\n")
+                else:
+                    stats.dump_stats(os.path.join(self.__path_output, "profiling_" + name + ".prof"))
+                    stats.sort_stats("cumulative").print_stats(self.__top)
+                report.write("---- Top functions (cumulative time) ----\n" + stream.getvalue())
+                report.write("---- Top allocations (bytes, blocks, line; first " + str(data["snapshots"]) + " calls) ----\n")
+                allocations = sorted(data["allocations"].items(), key=lambda item: item[1][0], reverse=True)[:self.__top]
+                for line, (size, count) in allocations:
+                    report.write(f"{size:12d} {count:8d}  {line}\n")
+        print("Profiling report written to: " + file_name)
+        return file_name
@@ -0,0 +1,204 @@
+""" Scheduler of emission jobs for several issuing centers sharing one connection pool and token... """
+import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from .certidigitalconfig import CertiDigitalConfig
+from .certidigitalexception import CertiDigitalException
+from .certidigitalmanager import CertiDigitalManager
+
+
+class CertiDigitalEmissionScheduler:
+    """ Runs emission tasks of several issuing centers concurrently...
+        Centers are served by smooth weighted round-robin, with a global and a per-center concurrency cap,
+        so one huge faculty can't starve the others. """
+
+    def __init__(self, token, manager=None, max_workers=None, max_per_center=None, weights=None, progress_callback=None, config=None):
+        config = config or (manager.config if manager is not None else CertiDigitalConfig.get_default())
+        if max_workers is None:
+            max_workers = config.get_param("max_concurrent_emissions", 8)
+        if max_per_center is None:
+            max_per_center = config.get_param("max_concurrent_emissions_per_center", 2)
+        self.__max_workers = int(max_workers)
+        self.__max_per_center = int(max_per_center)
+        if self.__max_workers < 1 or self.__max_per_center < 1:
+            raise CertiDigitalException("Emission concurrency caps must be >= 1")
+        self.__centers = {}
+        for issuing_center_id, weight in (weights or {}).items():
+            self.__check_weight(weight)
+            self.__get_center(issuing_center_id)["weight"] = weight
+        self.__token = token
+        self.__manager = manager or CertiDigitalManager(config, CertiDigitalManager.create_session(self.__max_workers))
+        self.__progress_callback = progress_callback
+        self.__executor = ThreadPoolExecutor(max_workers=self.__max_workers, thread_name_prefix="certidigital-emission")
+        self.__condition = threading.Condition()
+        self.__num_running = 0
+        self.__num_unfinished = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.shutdown()
+
+    @property
+    def manager(self):
+        """ Returns the manager (and so the connection pool) shared by every task... """
+        return self.__manager
+
+    @staticmethod
+    def __check_weight(weight):
+        """ Rejects weights that would never (or wrongly) give workers to an issuing center... """
+        if weight < 1:
+            raise CertiDigitalException("Issuing center weight must be >= 1")
+
+    def __get_center(self, issuing_center_id):
+        """ Returns the state of an issuing center: weight, queued tasks, running tasks, round-robin weight and progress... """
+        if issuing_center_id not in self.__centers:
+            self.__centers[issuing_center_id] = {"weight": 1, "pending": deque(), "running": 0, "current_weight": 0,
+                                                 "progress": {"submitted": 0, "running": 0, "completed": 0, "failed": 0, "cancelled": 0}}
+        return self.__centers[issuing_center_id]
+
+    def set_weight(self, issuing_center_id, weight):
+        """ Sets the share of the workers given to an issuing center (default 1)... """
+        self.__check_weight(weight)
+        with self.__condition:
+            self.__get_center(issuing_center_id)["weight"] = weight
+            self.__dispatch()
+
+    def submit(self, issuing_center_id, fn, *args, **kwargs):
+        """ Queues a task fn(manager, issuing_center_id, token, *args, **kwargs) for the issuing center and returns its future... """
+        future = Future()
+        with self.__condition:
+            center = self.__get_center(issuing_center_id)
+            center["pending"].append((future, fn, args, kwargs))
+            center["progress"]["submitted"] += 1
+            self.__num_unfinished += 1
+            self.__dispatch()
+        return future
+
+    def submit_emission(self, issuing_center_id, credential_id, block_files, alias):
+        """ Issues all the block files of a credential for an issuing center...
+            Blocks of one emission run in order (they share the emissions block id), while different emissions and centers are interleaved.
+            Returns a future with the list of emission responses, one per block. """
+        emission_future = Future()
+        responses = []
+
+        def issue_block(manager, center_id, token, block_index, block_id):
+            return manager.credentials_issue_through_template(center_id, credential_id, token, block_files[block_index], alias=alias, block_id=block_id)
+
+        def on_block_done(block_index, block_future):
+            try:
+                response = block_future.result()
+            except Exception as e:  # pylint: disable=broad-except
+                emission_future.set_exception(e)
+                return
+            responses.append(response)
+            if block_index + 1 == len(block_files):
+                emission_future.set_result(responses)
+                return
+            block_id = response[0]["emissionsBlockId"] if response else None
+            self.__submit_block(issuing_center_id, issue_block, block_index + 1, block_id, on_block_done)
+
+        if not block_files:
+            emission_future.set_result(responses)
+        else:
+            self.__submit_block(issuing_center_id, issue_block, 0, None, on_block_done)
+        return emission_future
+
+    def __submit_block(self, issuing_center_id, issue_block, block_index, block_id, on_block_done):
+        """ Queues one block of an emission, chaining the next one when it's done... """
+        block_future = self.submit(issuing_center_id, issue_block, block_index, block_id)
+        block_future.add_done_callback(lambda f: on_block_done(block_index, f))
+
+    def __dispatch(self):
+        """ Starts queued tasks while there are free workers (must be called holding the condition)... """
+        while self.__num_running < self.__max_workers:
+            issuing_center_id = self.__next_center()
+            if issuing_center_id is None:
+                return
+            center = self.__centers[issuing_center_id]
+            future, fn, args, kwargs = center["pending"].popleft()
+            if not future.set_running_or_notify_cancel():
+                self.__finish(issuing_center_id, "cancelled", started=False)
+                continue
+            center["running"] += 1
+            center["progress"]["running"] += 1
+            self.__num_running += 1
+            self.__executor.submit(self.__run, issuing_center_id, future, fn, args, kwargs)
+
+    def __next_center(self):
+        """ Picks the next issuing center by smooth weighted round-robin among the ones with queued tasks and free slots... """
+        eligible = [center_id for center_id, center in self.__centers.items() if center["pending"] and center["running"] < self.__max_per_center]
+        if not eligible:
+            return None
+        total_weight = 0
+        for center_id in eligible:
+            center = self.__centers[center_id]
+            center["current_weight"] += center["weight"]
+            total_weight += center["weight"]
+        chosen = max(eligible, key=lambda center_id: self.__centers[center_id]["current_weight"])
+        self.__centers[chosen]["current_weight"] -= total_weight
+        return chosen
+
+    def __run(self, issuing_center_id, future, fn, args, kwargs):
+        """ Runs a task in a worker thread and frees its slot... """
+        # The future is resolved before freeing the slot, so chained tasks are queued before wait() can return...
+        try:
+            result = fn(self.__manager, issuing_center_id, self.__token, *args, **kwargs)
+        except Exception as e:  # pylint: disable=broad-except
+            future.set_exception(e)
+            outcome = "failed"
+        else:
+            future.set_result(result)
+            outcome = "completed"
+        with self.__condition:
+            self.__finish(issuing_center_id, outcome)
+        if self.__progress_callback is not None:
+            self.__progress_callback(self.get_progress())
+
+    def __finish(self, issuing_center_id, outcome, started=True):
+        """ Updates the counters of a finished task and dispatches more work (must be called holding the condition)... """
+        center = self.__centers[issuing_center_id]
+        if started:
+            center["running"] -= 1
+            center["progress"]["running"] -= 1
+            self.__num_running -= 1
+        center["progress"][outcome] += 1
+        self.__num_unfinished -= 1
+        self.__dispatch()
+        self.__condition.notify_all()
+
+    def get_progress(self):
+        """ Returns the progress of every issuing center plus the aggregated totals... """
+        with self.__condition:
+            progress = {center_id: dict(center["progress"]) for center_id, center in self.__centers.items() if center["progress"]["submitted"]}
+        totals = {"submitted": 0, "running": 0, "completed": 0, "failed": 0, "cancelled": 0}
+        for counters in progress.values():
+            for key in totals:
+                totals[key] += counters[key]
+        return {"centers": progress, "totals": totals}
+
+    def print_progress(self):
+        """ Prints the aggregated progress report... """
+        progress = self.get_progress()
+        print("-------- Emission scheduler progress --------")
+        for center, counters in progress["centers"].items():
+            print("Issuing center " + str(center) + ": " + str(counters["completed"]) + "/" + str(counters["submitted"]) + " done, "
+                  + str(counters["running"]) + " running, " + str(counters["failed"]) + " failed, " + str(counters["cancelled"]) + " cancelled")
+        totals = progress["totals"]
+        print("Total: " + str(totals["completed"]) + "/" + str(totals["submitted"]) + " done, " + str(totals["failed"]) + " failed, "
+              + str(totals["cancelled"]) + " cancelled")
+        print("---------------------------------------------")
+        return progress
+
+    def wait(self, timeout=None):
+        """ Waits until every submitted task (including chained emission blocks) has finished... """
+        with self.__condition:
+            return self.__condition.wait_for(lambda: self.__num_unfinished == 0, timeout=timeout)
+
+    def shutdown(self, wait=True):
+        """ Waits for the queued tasks (optionally) and releases the worker threads... """
+        if wait:
+            self.wait()
+        self.__executor.shutdown(wait=wait)
@@ -0,0 +1,39 @@
+""" Upload telemetry: progress and throughput of the multipart uploads sent to the API... """
+import time
+
+from requests_toolbelt import MultipartEncoderMonitor
+
+
+class CertiDigitalUploadProgress:
+    """ Wraps a MultipartEncoder so the callback receives the upload progress and throughput while the body is streamed...
+        The callback gets a dict with name, bytes_sent, total_bytes, elapsed (seconds) and bytes_per_second. """
+
+    def __init__(self, name, callback, min_interval=0.5):
+        self.__name = name
+        self.__callback = callback
+        self.__min_interval = min_interval
+        self.__start_time = None
+        self.__last_report = 0.0
+
+    def monitor(self, encoder):
+        """ Returns the monitor to be sent as request body instead of the encoder... """
+        self.__start_time = time.monotonic()
+        return MultipartEncoderMonitor(encoder, self.__on_read)
+
+    def __on_read(self, monitor):
+        """ Called by the monitor after every read of the body, reports at most once every min_interval seconds (and at the end)... """
+        now = time.monotonic()
+        finished = monitor.bytes_read >= monitor.len
+        if not finished and now - self.__last_report < self.__min_interval:
+            return
+        self.__last_report = now
+        elapsed = now - self.__start_time
+        self.__callback({"name": self.__name, "bytes_sent": monitor.bytes_read, "total_bytes": monitor.len, "elapsed": elapsed,
+                         "bytes_per_second": monitor.bytes_read / elapsed if elapsed > 0 else 0.0})
+
+    @staticmethod
+    def print_progress(progress):
+        """ Default callback: prints the progress of the upload... """
+        percent = 100.0 * progress["bytes_sent"] / progress["total_bytes"] if progress["total_bytes"] else 100.0
+        print(f"Upload {progress['name']}: {progress['bytes_sent']}/{progress['total_bytes']} bytes ({percent:.1f}%), "
+              f"{progress['bytes_per_second'] / 1024:.1f} KB/s")
@@ -1,24 +1,63 @@
 """ MUtilities module for the resto of the CertiDigital software... """
 import json
+import multiprocessing
 from pathlib import Path
 
 import xlwt
 import pandas as pd
 
+from .certidigitalblockstatus import CertiDigitalEmissionBlockStatus
+from .certidigitalconfig import CertiDigitalConfig
 from .certidigitalexception import CertiDigitalException
+from .certidigitaljson import CertiDigitalJsonCodec
+from .certidigitalprofiler import profiled_phase
+
+
+_chunk_source = {}
+
+
+def _init_chunk_worker(header_rows, recipient_rows):
+    """ Keeps the recipients data in the worker process, so it's sent once per worker instead of once per chunk... """
+    _chunk_source["header_rows"] = header_rows
+    _chunk_source["recipient_rows"] = recipient_rows
+
+
+def _write_rows_xls(file_name, header_rows, recipient_rows):
+    """ Writes an XLS emission file from the header rows and the recipients rows (lists of tuples)... """
+    wb = xlwt.Workbook()
+    sheet = wb.add_sheet('data')
+    for row_num, row in enumerate(header_rows):
+        for col_num, value in enumerate(row):
+            sheet.write(row_num, col_num, value)
+    for row_num, row in enumerate(recipient_rows):
+        for col_num, value in enumerate(row):
+            sheet.write(row_num + len(header_rows), col_num, value)
+    wb.save(file_name)
+    return file_name
+
+
+def _write_chunk_xls(task):
+    """ Pool task: writes the chunk of recipients [chunk_start, chunk_end) kept by _init_chunk_worker... """
+    chunk_file, chunk_start, chunk_end = task
+    return _write_rows_xls(chunk_file, _chunk_source["header_rows"], _chunk_source["recipient_rows"][chunk_start:chunk_end])
 
 
 class CertiDigitalUtil:
     """ Main class to manage CertiDigital utilities... """
 
-    def __init__(self):
-        self.__path_data = str(Path.home()) + "/PycharmProjects/CertiDigital.API.Sample/src/data"
+    def __init__(self, config=None):
+        self.__config = config or CertiDigitalConfig.get_default()
+
+    @property
+    def config(self):
+        """ Returns the configuration used by this util... """
+        return self.__config
 
     def read_data_from_json(self, fi, mode):
         """ Opens input json file with data of the booking, checks formats and returns data... """
         try:
             with open(fi, encoding='UTF-8', mode=mode) as f:
-                data = json.load(f)
+                data = CertiDigitalJsonCodec.get_default().loads(f.read())
         except FileNotFoundError as e:
             raise CertiDigitalException("Wrong file or file path") from e
         except json.JSONDecodeError as e:
@@ -29,7 +68,7 @@ class CertiDigitalUtil:
         """ Opens output json file and dumps data with bookings... """
         try:
             with open(fi, encoding='UTF-8', mode=mode) as f:
-                json.dump(data, f, indent=4)
+                f.write(CertiDigitalJsonCodec.get_default().dumps(data, indent=4))
         except FileNotFoundError as e:
             raise CertiDigitalException("Wrong file or file path") from e
         except json.JSONDecodeError as e:
@@ -43,13 +82,14 @@ class CertiDigitalUtil:
                 return api
         return None
 
+    @profiled_phase("fill")
     def fill_recipients_to_template(self):
         """ Copies the data inside EmissionRecipients.xls into the EmissionRecipientsTemplate.xls file"""
-        recipients_file_name = self.__path_data + "/advancedcredential/EmissionRecipients.xls"
+        recipients_file_name = self.__config.data_file("advancedcredential", "EmissionRecipients.xls")
         recipients_df = pd.read_excel(recipients_file_name, skiprows=4, header=None)
-        template_file_name = self.__path_data + "/advancedcredential/EmissionRecipientsTemplate.xls"
+        template_file_name = self.__config.data_file("advancedcredential", "EmissionRecipientsTemplate.xls")
         destination_df = pd.read_excel(template_file_name, header=None)
-        destination_file_name = self.__path_data + "/advancedcredential/EmissionRecipientsOutput.xls"
+        destination_file_name = self.__config.data_file("advancedcredential", "EmissionRecipientsOutput.xls")
         wb = xlwt.Workbook()
         sheet = wb.add_sheet('data')
         for row_num, row in destination_df.iterrows():
@@ -61,46 +101,70 @@ class CertiDigitalUtil:
         wb.save(destination_file_name)
         return True
 
-    def split_recipients_output(self, file_name, block_size, header_rows=4):
+    def write_recipients_xls(self, file_name, header_df, recipients_df):
+        """ Writes an XLS emission file with the header rows followed by the recipients rows... """
+        return _write_rows_xls(file_name, list(header_df.itertuples(index=False, name=None)), list(recipients_df.itertuples(index=False, name=None)))
+
+    def split_recipients_output(self, file_name, block_size, header_rows=4, processes=None):
         """ Splits EmissionRecipientsOutput.xls into chunks of block_size recipients (keeps header rows). """
+        return list(self.iter_recipients_output(file_name, block_size, header_rows, processes))
+
+    def iter_recipients_output(self, file_name, block_size, header_rows=4, processes=None):
+        """ Same as split_recipients_output but yields every _partN chunk file, in order, as soon as it's written...
+            With processes > 1 (default: xls_processes parameter) the workbooks are built in a process pool.
+            Arguments are checked on the call, before the file is read. """
         if block_size < 1:
             raise CertiDigitalException("Emission block size must be >= 1")
-        data_df = pd.read_excel(file_name, header=None)
-        if data_df.empty:
-            return [file_name]
-        header_df = data_df.iloc[:header_rows]
-        recipients_df = data_df.iloc[header_rows:]
-        if recipients_df.empty:
-            return [file_name]
-        base_path = Path(file_name)
-        chunk_files = []
-        chunk_index = 1
-        for chunk_start in range(0, len(recipients_df), block_size):
-            chunk_df = recipients_df.iloc[chunk_start:chunk_start + block_size]
-            wb = xlwt.Workbook()
-            sheet = wb.add_sheet('data')
-            for row_num, row in enumerate(header_df.itertuples(index=False, name=None)):
-                for col_num, value in enumerate(row):
-                    sheet.write(row_num, col_num, value)
-            for row_num, row in enumerate(chunk_df.itertuples(index=False, name=None)):
-                for col_num, value in enumerate(row):
-                    sheet.write(row_num + header_rows, col_num, value)
-            chunk_file = str(base_path.with_name(f"{base_path.stem}_part{chunk_index}{base_path.suffix}"))
-            wb.save(chunk_file)
-            chunk_files.append(chunk_file)
-            chunk_index += 1
-        return chunk_files
+        return self.__iter_recipients_output(file_name, block_size, header_rows, processes)
+
+    def __iter_recipients_output(self, file_name, block_size, header_rows, processes):
+        """ Generator behind iter_recipients_output, writing each chunk when the consumer asks for it... """
+        # The split phase is profiled piece by piece, so the time spent by the consumer between chunks isn't counted...
+        profiler = self.__config.profiler
+        with profiler.phase("split"):
+            data_df = pd.read_excel(file_name, header=None)
+            header_df = data_df.iloc[:header_rows]
+            recipients_df = data_df.iloc[header_rows:]
+            base_path = Path(file_name)
+            tasks = []
+            for chunk_index, chunk_start in enumerate(range(0, len(recipients_df), block_size), start=1):
+                chunk_file = str(base_path.with_name(f"{base_path.stem}_part{chunk_index}{base_path.suffix}"))
+                tasks.append((chunk_file, chunk_start, chunk_start + block_size))
+            header_rows_list = list(header_df.itertuples(index=False, name=None))
+            recipient_rows = list(recipients_df.itertuples(index=False, name=None))
+        if not tasks:
+            yield file_name
+            return
+        processes = min(int(processes or self.__config.get_param("xls_processes", 1)), len(tasks))
+        if processes <= 1:
+            for chunk_file, chunk_start, chunk_end in tasks:
+                with profiler.phase("split"):
+                    _write_rows_xls(chunk_file, header_rows_list, recipient_rows[chunk_start:chunk_end])
+                yield chunk_file
+            return
+        with multiprocessing.Pool(processes, initializer=_init_chunk_worker, initargs=(header_rows_list, recipient_rows)) as pool:
+            chunk_files = pool.imap(_write_chunk_xls, tasks)
+            while True:
+                with profiler.phase("split"):
+                    chunk_file = next(chunk_files, None)
+                if chunk_file is None:
+                    return
+                yield chunk_file
 
     def process_emission_block_status(self, emission_block_id, emission_block):
-        """ Handles the emission block status report... """
+        """ Handles the emission block status report (emission list or CertiDigitalEmissionBlockStatus)... """
         status_map = {1: "Issued (not sealed)", 2: "Sealed", 3: "Rejected", 4: "Issued with error", 5: "Duplicated", 6: "Re-Issued",
                       7: "Sealed with error", 8: "Sent with error", 9: "Sent with error (EU)", 10: "Queued for sealing",
                       11: 'Queued for sending', 12: "Sent to validation", 13: "No status"}
-        status_count = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
-        uuid_list = []
-        for emission in emission_block:
-            status_count[(emission.get("stateId") or 13) - 1] = status_count[(emission.get("stateId") or 13) - 1] + 1
-            uuid_list.append(emission["uuid"])
+        if isinstance(emission_block, CertiDigitalEmissionBlockStatus):
+            status_count = emission_block.count_by_state()
+            uuid_list = emission_block.get_uuids()
+        else:
+            status_count = [0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0]
+            uuid_list = []
+            for emission in emission_block:
+                status_count[(emission.get("stateId") or 13) - 1] = status_count[(emission.get("stateId") or 13) - 1] + 1
+                uuid_list.append(emission["uuid"])
         print("-------- Credentials block status report: BLOCK_ID = " + str(emission_block_id) + " --------")
         for status in status_map:
             if status_count[status-1] != 0:
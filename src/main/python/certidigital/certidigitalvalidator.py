@@ -0,0 +1,171 @@
+""" Local pre-validation of the emission recipients, done before paying for the issuance round trip... """
+import os
+import threading
+from pathlib import Path
+
+import pandas as pd
+
+from .certidigitalblockstatus import CertiDigitalEmissionBlockStatus
+from .certidigitalconfig import CertiDigitalConfig
+from .certidigitalexception import CertiDigitalException
+from .certidigitalutil import CertiDigitalUtil
+
+
+class CertiDigitalIssuedLedger:
+    """ Local ledger of the recipients already issued for each credential...
+        Only a 64-bit hash of the recipient key is stored (no personal data). """
+
+    def __init__(self, file_name):
+        self.__file_name = file_name
+        self.__issued = None
+        self.__lock = threading.Lock()
+
+    @property
+    def file_name(self):
+        """ Returns the file where the ledger is persisted... """
+        return self.__file_name
+
+    def __load(self):
+        """ Reads the ledger file the first time it's needed... """
+        if self.__issued is None:
+            self.__issued = {}
+            if os.path.isfile(self.__file_name):
+                util = CertiDigitalUtil()
+                stored = util.read_data_from_json(self.__file_name, "r")
+                self.__issued = {credential_id: set(hashes) for credential_id, hashes in stored.items()}
+        return self.__issued
+
+    def get_issued(self, credential_id):
+        """ Returns the set of recipient hashes already issued for the credential... """
+        with self.__lock:
+            return set(self.__load().get(str(credential_id), set()))
+
+    def record_issued(self, credential_id, recipient_hashes):
+        """ Adds the recipient hashes to the credential entry and persists the ledger... """
+        with self.__lock:
+            issued = self.__load()
+            issued.setdefault(str(credential_id), set()).update(int(h) for h in recipient_hashes)
+            util = CertiDigitalUtil()
+            util.write_data_to_json(self.__file_name, {key: sorted(value) for key, value in issued.items()}, "w")
+        return True
+
+
+class CertiDigitalRecipientValidator:
+    """ Vectorized validation of the recipients frame: required columns, address/ID formats and duplicates
+        (inside the file and against the local ledger of issued credentials)... """
+
+    REQUIRED_FIELDS = ("REC.givenName", "REC.familyName", "REC.primaryDeliveryAddress")
+    KEY_FIELDS = ("REC.givenName", "REC.familyName", "REC.primaryDeliveryAddress")
+    ADDRESS_FIELDS = ("REC.primaryDeliveryAddress", "REC.secondaryDeliveryAddress")
+    ADDRESS_PATTERN = r"[^@\s]+@[^@\s]+\.[^@\s]+|(?:https?://|did:)\S+"
+    ISSUED_STATES = (2, 6, 11)  # Sealed, Re-Issued, Queued for sending...
+
+    def __init__(self, config=None, required_fields=None, id_patterns=None, ledger=None):
+        self.__config = config or CertiDigitalConfig.get_default()
+        self.__required_fields = tuple(required_fields or self.REQUIRED_FIELDS)
+        self.__id_patterns = dict(id_patterns if id_patterns is not None else self.__config.get_param("recipient_id_patterns", {}))
+        ledger_file = self.__config.get_param("issued_ledger", "")
+        self.__ledger = ledger or (CertiDigitalIssuedLedger(self.__config.data_file(ledger_file)) if ledger_file else None)
+
+    @property
+    def ledger(self):
+        """ Returns the ledger of issued recipients (None when the ledger check is disabled)... """
+        return self.__ledger
+
+    @staticmethod
+    def get_field_columns(header_df):
+        """ Maps every field path of the template (e.g. REC.givenName) to its column, using the first header row... """
+        field_columns = {}
+        for col_num, value in enumerate(header_df.iloc[0]):
+            if isinstance(value, str):
+                field_columns[value.split("}.", 1)[-1]] = header_df.columns[col_num]
+        return field_columns
+
+    def get_recipient_hashes(self, recipients_df, field_columns):
+        """ Returns the 64-bit hash of the normalized recipient key for every row... """
+        key = pd.Series("", index=recipients_df.index, dtype="string")
+        for field in self.KEY_FIELDS:
+            values = recipients_df[field_columns[field]].astype("string").str.strip().str.lower().fillna("")
+            key = key + "|" + values
+        return pd.util.hash_pandas_object(key, index=False)
+
+    def validate_recipients_output(self, file_name, credential_id, header_rows=4):
+        """ Splits the emission file into a file with the valid recipients and a reject file with the reason of each rejected row...
+            Returns the valid file name (None when every row is rejected, so there's nothing to issue), the reject file name
+            (None when nothing is rejected) and the number of rejected rows. """
+        data_df = pd.read_excel(file_name, header=None)
+        if len(data_df) < header_rows:
+            raise CertiDigitalException("Emission file has no template header rows: " + str(file_name))
+        header_df = data_df.iloc[:header_rows]
+        recipients_df = data_df.iloc[header_rows:]
+        field_columns = self.get_field_columns(header_df)
+        missing_fields = [field for field in self.__required_fields + self.KEY_FIELDS if field not in field_columns]
+        if missing_fields:
+            raise CertiDigitalException("Emission file lacks required template columns: " + str(missing_fields))
+
+        reasons = pd.Series("", index=recipients_df.index, dtype="string")
+
+        def reject(mask, reason):
+            return reasons.mask(mask.fillna(False).astype(bool), reasons + reason + "; ")
+
+        for field in self.__required_fields:
+            values = recipients_df[field_columns[field]].astype("string").str.strip()
+            reasons = reject(values.isna() | (values == ""), "Missing " + field)
+        for field in self.ADDRESS_FIELDS:
+            if field in field_columns:
+                values = recipients_df[field_columns[field]].astype("string").str.strip()
+                reasons = reject(values.notna() & (values != "") & ~values.str.fullmatch(self.ADDRESS_PATTERN), "Wrong address format in " + field)
+        for field, pattern in self.__id_patterns.items():
+            if field in field_columns:
+                values = recipients_df[field_columns[field]].astype("string").str.strip()
+                reasons = reject(values.notna() & ~values.str.fullmatch(pattern), "Wrong ID format in " + field)
+
+        recipient_hashes = self.get_recipient_hashes(recipients_df, field_columns)
+        valid = reasons == ""
+        duplicated = recipient_hashes[valid].duplicated(keep="first").reindex(recipients_df.index, fill_value=False)
+        reasons = reject(duplicated, "Duplicated recipient in file")
+        if self.__ledger is not None:
+            reasons = reject(recipient_hashes.isin(self.__ledger.get_issued(credential_id)), "Already issued (local ledger)")
+
+        rejected = reasons != ""
+        base_path = Path(file_name)
+        util = CertiDigitalUtil(self.__config)
+        num_rejected = int(rejected.sum())
+        valid_file = None
+        if num_rejected < len(recipients_df):
+            valid_file = util.write_recipients_xls(str(base_path.with_name(f"{base_path.stem}_valid{base_path.suffix}")), header_df, recipients_df[~rejected])
+        reject_file = None
+        if num_rejected:
+            reject_header_df = header_df.assign(rejectionReason=["rejectionReason"] + [""] * (len(header_df) - 1))
+            rejected_df = recipients_df[rejected].assign(rejectionReason=reasons[rejected].str.rstrip("; "))
+            reject_file = util.write_recipients_xls(str(base_path.with_name(f"{base_path.stem}_rejected{base_path.suffix}")), reject_header_df, rejected_df)
+        print("Recipients validation: " + str(len(recipients_df) - num_rejected) + " valid, " + str(num_rejected) + " rejected")
+        return valid_file, reject_file, num_rejected
+
+    def get_emission_recipients(self, file_name, emission_response, header_rows=4):
+        """ Maps the uuid of every emission created by an uploaded emission file to the hash of its recipient
+            (the issuance response has one emission per row, in the order of the file)... """
+        data_df = pd.read_excel(file_name, header=None)
+        recipients_df = data_df.iloc[header_rows:]
+        if len(emission_response) != len(recipients_df):
+            raise CertiDigitalException("Issuance response has " + str(len(emission_response)) + " emissions for " + str(len(recipients_df)) + " recipients")
+        if recipients_df.empty:
+            return {}
+        field_columns = self.get_field_columns(data_df.iloc[:header_rows])
+        recipient_hashes = self.get_recipient_hashes(recipients_df, field_columns)
+        return {emission["uuid"]: int(recipient_hash) for emission, recipient_hash in zip(emission_response, recipient_hashes)}
+
+    def record_issued_emissions(self, credential_id, emission_recipients, emission_block):
+        """ Adds to the local ledger the recipients whose emissions reached an issued state (ISSUED_STATES) in the block status
+            (emission list or CertiDigitalEmissionBlockStatus), so rejected, erroneous or duplicated ones can be issued again...
+            Returns the number of recipients recorded. """
+        if self.__ledger is None:
+            return 0
+        if isinstance(emission_block, CertiDigitalEmissionBlockStatus):
+            issued_uuids = [uuid for state_id in self.ISSUED_STATES for uuid in emission_block.get_uuids(state_id)]
+        else:
+            issued_uuids = [emission["uuid"] for emission in emission_block if emission.get("stateId") in self.ISSUED_STATES]
+        recipient_hashes = [emission_recipients[uuid] for uuid in issued_uuids if uuid in emission_recipients]
+        if recipient_hashes:
+            self.__ledger.record_issued(credential_id, recipient_hashes)
+        return len(recipient_hashes)
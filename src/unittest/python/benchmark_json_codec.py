@@ -0,0 +1,57 @@
+""" Benchmark of the JSON codec backends on real-sized emission block and JSON-LD payloads...
+    Run with: python src/unittest/python/benchmark_json_codec.py [number_of_emissions] """
+import json
+import sys
+import time
+import uuid
+
+from certidigital import CertiDigitalJsonCodec
+
+
+def build_emission_block(num_emissions):
+    """ Builds an emission block response with the shape returned by the getEmissionsBlockData endpoint... """
+    return {"id": 1, "alias": "bench", "issuingCenterId": 1, "creationDate": "2026-01-01T00:00:00",
+            "emissions": [{"uuid": str(uuid.uuid4()), "stateId": 2, "emissionsBlockId": 1, "credentialId": 1,
+                           "recipientName": "Nombre" + str(i), "recipientSurname": "Apellido Apellido" + str(i),
+                           "primaryDeliveryAddress": "recipient" + str(i) + "@uc3m.es", "creationDate": "2026-01-01T00:00:00",
+                           "sealDate": "2026-01-01T00:10:00", "errors": None, "grade": 8.5} for i in range(num_emissions)]}
+
+
+def build_jsonld():
+    """ Builds a credential JSON-LD document of the usual size (~60 KB)... """
+    return {"@context": ["https://www.w3.org/2018/credentials/v1", "http://data.europa.eu/snb/model/context/edc-ap"],
+            "type": ["VerifiableCredential", "EuropeanDigitalCredential"],
+            "credentialSubject": {"id": "urn:epass:person:1", "givenName": {"es": "Nombre"}, "familyName": {"es": "Apellido"},
+                                  "hasClaim": [{"id": "urn:epass:learningAchievement:" + str(i), "title": {"es": "Asignatura " + str(i)},
+                                                "description": {"es": "Descripcion de la asignatura " * 10},
+                                                "grade": {"noteLiteral": {"es": "8.5"}}} for i in range(150)]}}
+
+
+def measure(function, repetitions):
+    """ Returns the best time of the given repetitions... """
+    best = float("inf")
+    for _ in range(repetitions):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    """ Compares decoding (and compact encoding) times of the json and orjson backends... """
+    num_emissions = int(sys.argv[1]) if len(sys.argv) > 1 else 25000
+    payloads = {"emission block (" + str(num_emissions) + " emissions)": json.dumps(build_emission_block(num_emissions)).encode("utf-8"),
+                "credential JSON-LD": json.dumps(build_jsonld()).encode("utf-8")}
+    codecs = {"json": CertiDigitalJsonCodec("json"), "auto": CertiDigitalJsonCodec("auto")}
+    print("Fast backend: " + codecs["auto"].backend)
+    for name, payload in payloads.items():
+        data = json.loads(payload)
+        print(f"{name}: {len(payload) / 1e6:.2f} MB")
+        for backend, codec in codecs.items():
+            loads_time = measure(lambda c=codec, p=payload: c.loads(p), 5)
+            dumps_time = measure(lambda c=codec, d=data: c.dumps_compact(d), 5)
+            print(f"  {backend:5s} ({codec.backend:6s}) loads {loads_time * 1000:8.2f} ms   dumps_compact {dumps_time * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
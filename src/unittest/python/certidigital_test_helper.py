@@ -0,0 +1,91 @@
+""" Shared fixtures of the offline unit tests: a temporary data root and a fake HTTP session... """
+import json
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+from certidigital import CertiDigitalConfig
+from certidigital import CertiDigitalJsonCache
+
+
+class FakeResponse:
+    """ Stands for the API responses... """
+
+    encoding = None
+    text = ""
+
+    def __init__(self, content=b"", status_code=200):
+        self.content = content
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        """ Never fails... """
+
+
+class FakeSession:
+    """ Stands for the HTTP session: records every request (reading streamed bodies the same way requests does)
+        and answers with the given handlers, which receive the recorded request and return the response content... """
+
+    def __init__(self, get_handler=None, post_handler=None):
+        self.requests = []
+        self.__get_handler = get_handler or (lambda request: b"[]")
+        self.__post_handler = post_handler or (lambda request: b'[{"emissionsBlockId": 1}]')
+        self.__lock = threading.Lock()
+
+    def __record(self, method, api_url, kwargs):
+        """ Stores the request with its body already read... """
+        body = kwargs.get("data")
+        if hasattr(body, "read"):
+            chunks = []
+            chunk = body.read(1024)
+            while chunk:
+                chunks.append(chunk)
+                chunk = body.read(1024)
+            body = b"".join(chunks)
+        request = {"method": method, "url": api_url, "params": kwargs.get("params"), "headers": kwargs.get("headers"),
+                   "body": body, "json": kwargs.get("json")}
+        with self.__lock:
+            self.requests.append(request)
+        return request
+
+    def get(self, api_url, **kwargs):
+        """ Records a GET request... """
+        return FakeResponse(self.__get_handler(self.__record("get", api_url, kwargs)))
+
+    def post(self, api_url, **kwargs):
+        """ Records a POST request... """
+        return FakeResponse(self.__post_handler(self.__record("post", api_url, kwargs)))
+
+
+class CertiDigitalTestCase(unittest.TestCase):
+    """ Base of the tests that need a temporary data root: params.json holds PARAMS and, when API_LIST is set,
+        the project params_api.json is copied too. self.config is a configuration over that root with its own JSON cache... """
+
+    PARAMS = {}
+    API_LIST = False
+
+    def setUp(self):
+        """ Creates the temporary data root and its configuration... """
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path_data = self.tmp_dir.name
+        if self.API_LIST:
+            shutil.copy(CertiDigitalConfig().data_file("params_api.json"), self.path_data)
+        self.write_params(self.PARAMS)
+        self.config = CertiDigitalConfig(self.path_data, os.path.join(self.path_data, "output"), CertiDigitalJsonCache())
+
+    def tearDown(self):
+        """ Removes the temporary data root... """
+        self.tmp_dir.cleanup()
+
+    def write_params(self, params, file_name="params.json"):
+        """ Writes a JSON data file, moving its modification time forward so cached copies are read again... """
+        file_name = os.path.join(self.path_data, file_name)
+        existed = os.path.exists(file_name)
+        with open(file_name, "w", encoding="UTF-8") as f:
+            json.dump(params, f)
+        if existed:
+            stat = os.stat(file_name)
+            os.utime(file_name, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+        return file_name
@@ -2,7 +2,7 @@
 
 import os
 import unittest
-from pathlib import Path
+from certidigital import CertiDigitalConfig
 from certidigital import CertiDigitalManager
 from certidigital import CertiDigitalUtil
 
@@ -11,7 +11,8 @@ class TestAdvancedCredentialCreation(unittest.TestCase):
     """ Creates tests for an advanced credential...
         Credential contains an achievement, some activities, one assessment, some learning outcomes and a diploma... """
 
-    __path_data = str(Path.home()) + "/PycharmProjects/CertiDigital.API.Sample/src/data/"
+    __config = CertiDigitalConfig.get_default()
+    __path_data = __config.path_data
 
     @classmethod
     def setUpClass(cls):
@@ -21,7 +22,7 @@ class TestAdvancedCredentialCreation(unittest.TestCase):
         cm = CertiDigitalManager()
         cls.__api_token = cm.get_token_from_api(auth_info["clientId"], auth_info["clientSecret"], auth_info["username"], auth_info["password"], auth_info["tokenUrl"])
 
-        ids_file = cls.__path_data + "advancedcredential/idlist.json"
+        ids_file = cls.__path_data + "/advancedcredential/idlist.json"
         if not os.path.isfile(ids_file):
             print("File not found:  " + str(ids_file))
             return True
@@ -62,7 +63,7 @@ class TestAdvancedCredentialCreation(unittest.TestCase):
         # 1. Get logged user info to gather university id and some other data...
         cm = CertiDigitalManager()
         util = CertiDigitalUtil()
-        params = util.read_data_from_json(self.__path_data + "/params.json", "r")
+        params = self.__config.params
         user_info = cm.get_working_user_info(self.__api_token["access_token"])
         print("User info response: " + str(user_info))
         # Awarding organization to be used. Must be known in advance...
@@ -1,20 +1,22 @@
 """ Test for the emission of an advanced credential for a course with several subjects and assessments... """
-import json
 import random
 import string
 import time
 import unittest
-from pathlib import Path
 
+from certidigital import CertiDigitalConfig
 from certidigital import CertiDigitalManager
+from certidigital import CertiDigitalOutputSink
+from certidigital import CertiDigitalRecipientValidator
 from certidigital import CertiDigitalUtil
 
 
 class TestAdvancedCredentialEmission(unittest.TestCase):
     """ Creates tests for a complex credential emission """
 
-    __path_data = str(Path.home()) + "/PycharmProjects/CertiDigital.API.Sample/src/data"
-    __path_output = str(Path.home()) + "/PycharmProjects/CertiDigital.API.Sample/src/unittest/output_files"
+    __config = CertiDigitalConfig.get_default()
+    __path_data = __config.path_data
+    __path_output = __config.path_output
 
     @classmethod
     def setUpClass(cls):
@@ -42,7 +44,7 @@ class TestAdvancedCredentialEmission(unittest.TestCase):
         # Get logged user info...
         cm = CertiDigitalManager()
         util = CertiDigitalUtil()
-        params = util.read_data_from_json(self.__path_data + "/params.json", "r")
+        params = self.__config.params
         user_info = cm.get_working_user_info(self.__api_token["access_token"])
         print("User info response: " + str(user_info))
 
@@ -70,18 +72,28 @@ class TestAdvancedCredentialEmission(unittest.TestCase):
         step_1_end = time.time()
         print(f"Time for step 1 (XLS template download and fill with recipients): {step_1_end - start_time:.2f} seconds")
 
-        params = util.read_data_from_json(self.__path_data + "/params.json", "r")
         emission_block_size = int(params.get("emission_block_size", 1))
         download_credentials = params.get("downloadCredentials", True)
         alias = ''.join(random.choices(string.ascii_letters + string.digits, k=6))
         credential_emission_response = None
         emissions_block_id = None
 
-        # 2. Issue the credential in blocks...
+        # 2. Validate recipients locally (rejected rows go to the reject file) and issue the credential in blocks...
         file_name = self.__path_data + "/advancedcredential/EmissionRecipientsOutput.xls"
-        block_files = util.split_recipients_output(file_name, emission_block_size)
+        validator = CertiDigitalRecipientValidator()
+        if params.get("validate_recipients", True):
+            file_name, reject_file, num_rejected = validator.validate_recipients_output(file_name, credential_id)
+            if num_rejected:
+                print("Rejected recipients (" + str(num_rejected) + ") written to: " + reject_file)
+            if file_name is None:
+                print("Skipping issuance (no valid recipients).")
+                return
+        # Recipient of every emission (by uuid), recorded in the ledger only once its credential is sealed...
+        emission_recipients = {}
+        # Chunks are built in a process pool when xls_processes > 1 and each one is uploaded as soon as it's ready...
+        block_files = util.iter_recipients_output(file_name, emission_block_size, processes=params.get("xls_processes", 1))
         for block_index, block_file in enumerate(block_files, start=1):
-            print(f"--- Emission block {block_index} of {len(block_files)} ---")
+            print(f"--- Emission block {block_index} ---")
             block_start_time = time.time()
             credential_emission_response = cm.credentials_issue_through_template(issuing_center, credential_id, self.__api_token["access_token"], block_file, alias=alias, block_id=emissions_block_id)
             print("Credential emission response: " + str(credential_emission_response))
@@ -89,16 +101,18 @@ class TestAdvancedCredentialEmission(unittest.TestCase):
             elapsed = step_2_end - block_start_time
             print("Time for step 2 (emissión process for " + str(len(credential_emission_response)) + " recipients): " + str(round(elapsed, 2)) + " seconds...")
             emissions_block_id = credential_emission_response[0]["emissionsBlockId"]
+            if validator.ledger is not None:
+                emission_recipients.update(validator.get_emission_recipients(block_file, credential_emission_response))
 
         # 3. Get the emission id (emission block) from the (last) response (which is common to all executions)...
+        #    Only the uuid and state of each emission are needed, so the lightweight block status is used...
         emissions_block_id = credential_emission_response[0]["emissionsBlockId"]
-        emissions_block_response = cm.get_emissions_block_data(emissions_block_id, self.__api_token["access_token"])
+        emissions_block_status = cm.get_emissions_block_status(emissions_block_id, self.__api_token["access_token"])
 
         # 4. Unpack the treated credentials and call the seal process for the correctly issued ones...
         #    Notice that this process itself sends email to recipients and sends to CertiDigital & Europass wallets...
-        emission_list = emissions_block_response["emissions"]
-        print('Total credentials in emission block with id=' + str(emissions_block_id) + ': ' + str(len(emission_list)))
-        uuid_list, num_seal_pending = util.process_emission_block_status(emissions_block_id, emission_list)
+        print('Total credentials in emission block with id=' + str(emissions_block_id) + ': ' + str(len(emissions_block_status)))
+        uuid_list, num_seal_pending = util.process_emission_block_status(emissions_block_id, emissions_block_status)
         credentials_seal_response = cm.seal_credentials(issuing_center, uuid_list, self.__api_token["access_token"])
         print("Credential seal response: " + str(credentials_seal_response))
         num_seal_pending = len(credentials_seal_response["emissions"])
@@ -108,33 +122,32 @@ class TestAdvancedCredentialEmission(unittest.TestCase):
 
         # 5. Once the credentials are queued for sealing, iterate through the list to show status by calling endpoint of emission block status...
         while num_seal_pending != 0:
-            emissions_block_response = cm.get_emissions_block_data(emissions_block_id, self.__api_token["access_token"])
-            emission_list = emissions_block_response["emissions"]
-            uuid_list, num_seal_pending = util.process_emission_block_status(emissions_block_id, emission_list)
+            emissions_block_status = cm.get_emissions_block_status(emissions_block_id, self.__api_token["access_token"])
+            uuid_list, num_seal_pending = util.process_emission_block_status(emissions_block_id, emissions_block_status)
             time.sleep(10)
+        emissions_block_status = cm.get_emissions_block_status(emissions_block_id, self.__api_token["access_token"])
+        print("Emission block status: " + str(emissions_block_status.info))
+        num_recorded = validator.record_issued_emissions(credential_id, emission_recipients, emissions_block_status)
+        print("Recipients recorded in the issued ledger: " + str(num_recorded))
         step_4_end = time.time()
         print(f"Time for step 4 (credentials sealing): {step_4_end - step_3_end:.2f} seconds")
 
         # 6. Download PDFs associated to sealed credentials...
         if download_credentials:
-            emissions_block_response = cm.get_emissions_block_data(emissions_block_id, self.__api_token["access_token"])
-            print("Emission block data response:" + str(emissions_block_response))
-            for credential in emissions_block_response["emissions"]:
-                if credential["stateId"] == 2: # Sealed only...
-                    # 6.1. Get the credential jsonld file...
-                    credential_details_response = cm.get_credential_details(credential["uuid"], self.__api_token["access_token"])
-                    jsonld_credential_file = credential_details_response["payload"]
-                    jsonld_data = json.loads(jsonld_credential_file)
-                    with open(self.__path_output + "/" + credential["uuid"] + ".jsonld", "w", encoding="utf-8") as jld_file:
-                        json.dump(jsonld_data, jld_file, indent=4, ensure_ascii=False)
-                    # 6.2. Get the pdf file associated to the jsonld file and save to disk...
-                    credential_pdf_response = cm.get_credential_pdf(credential_details_response, self.__api_token["access_token"])
-                    if credential_pdf_response.status_code == 200:
-                        with open(self.__path_output + "/" + credential["uuid"] + ".pdf", "wb") as pdf_file:
-                            pdf_file.write(credential_pdf_response.content)
+            # Output sink configured by output_format (one file per artifact or sharded archives with an index)...
+            # Details and PDFs are downloaded concurrently (max_concurrent_downloads), the PDF is rendered from the same raw details...
+            with CertiDigitalOutputSink.create(self.__config) as output_sink:
+                sealed_uuids = emissions_block_status.get_uuids(2) # Sealed only...
+                for credential in cm.iter_credentials_details(sealed_uuids, self.__api_token["access_token"], with_pdf=True):
+                    # 6.1. Save the credential jsonld file...
+                    output_sink.write_jsonld(credential.uuid, credential.details["payload"])
+                    # 6.2. Save the pdf file associated to the jsonld file...
+                    if credential.pdf_response.status_code == 200:
+                        output_sink.write_pdf(credential.uuid, credential.pdf_response.content)
         else:
             print("Skipping credential downloads (downloadCredentials=false).")
         step_5_end = time.time()
         print(f"Time for step 5 (credentials PDF download): {step_5_end - step_4_end:.2f} seconds")
+        self.__config.profiler.write_report()
         self.assertTrue(True)
 
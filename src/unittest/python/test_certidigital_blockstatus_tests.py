@@ -0,0 +1,44 @@
+""" Tests for the streaming projection of the emission block responses... """
+import json
+import unittest
+
+from certidigital import CertiDigitalEmissionBlockStatus
+from certidigital import CertiDigitalException
+from certidigital import CertiDigitalUtil
+
+
+class TestCertiDigitalEmissionBlockStatus(unittest.TestCase):
+    """ Checks that the incremental parser gives the same projection as a full parse, whatever the chunk boundaries... """
+
+    __emission_block = {"id": 77, "alias": "emissions \"[{,:}]\" ñ", "owner": {"emissions": [{"uuid": "fake"}]},
+                        "emissions": [{"uuid": "u" + str(i), "stateId": [None, 1, 2, 10][i % 4], "details": {"grade": 8.5, "tags": ["a", "b"]}}
+                                      for i in range(200)],
+                        "total": 200}
+
+    @staticmethod
+    def chunked(data, size):
+        """ Splits the bytes into chunks of the given size... """
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_projection_matches_full_parse(self):
+        """ uuids, states and scalar fields are the same for any chunk size (including cuts inside UTF-8 characters)... """
+        data = json.dumps(self.__emission_block, ensure_ascii=False, indent=2).encode("utf-8")
+        expected = CertiDigitalEmissionBlockStatus.from_json(self.__emission_block)
+        for size in (1, 7, 64, 4096, len(data)):
+            status = CertiDigitalEmissionBlockStatus.from_chunks(self.chunked(data, size))
+            self.assertEqual(status.uuids, expected.uuids)
+            self.assertEqual(list(status.state_ids), list(expected.state_ids))
+            self.assertEqual(status.info, {"id": 77, "alias": self.__emission_block["alias"], "total": 200})
+        self.assertEqual(len(expected.get_uuids(2)), 50)
+
+    def test_status_report(self):
+        """ The status report gives the same result for the compact status and for the emission list... """
+        util = CertiDigitalUtil()
+        status = CertiDigitalEmissionBlockStatus.from_chunks([json.dumps(self.__emission_block).encode("utf-8")])
+        self.assertEqual(util.process_emission_block_status(77, status), util.process_emission_block_status(77, self.__emission_block["emissions"]))
+
+    def test_wrong_format(self):
+        """ Truncated responses raise the business exception... """
+        data = json.dumps(self.__emission_block).encode("utf-8")[:-30]
+        with self.assertRaises(CertiDigitalException):
+            CertiDigitalEmissionBlockStatus.from_chunks(self.chunked(data, 100))
@@ -0,0 +1,43 @@
+""" Tests for the configuration object and the JSON data-file cache... """
+import os
+
+from certidigital import CertiDigitalException
+from certidigital import CertiDigitalManager
+
+from certidigital_test_helper import CertiDigitalTestCase
+from certidigital_test_helper import FakeSession
+
+
+class TestCertiDigitalConfig(CertiDigitalTestCase):
+    """ Checks data root resolution and cache invalidation by modification time... """
+
+    PARAMS = {"emission_block_size": 25}
+    API_LIST = True
+
+    def test_data_root_is_configurable(self):
+        """ Data files are resolved against the configured root... """
+        self.assertEqual(self.config.data_file("params.json"), os.path.join(self.path_data, "params.json"))
+        self.assertEqual(self.config.get_param("emission_block_size"), 25)
+        self.assertEqual(self.config.get_param("missing", "default"), "default")
+
+    def test_cached_until_file_changes(self):
+        """ Repeated reads return the same object until the file is modified... """
+        first = self.config.params
+        self.assertIs(first, self.config.params)
+        self.write_params({"emission_block_size": 50})
+        self.assertEqual(self.config.params["emission_block_size"], 50)
+
+    def test_missing_file(self):
+        """ A missing data file raises the business exception... """
+        with self.assertRaises(CertiDigitalException):
+            self.config.read_json("does_not_exist.json")
+
+    def test_manager_sees_api_changes(self):
+        """ Long-lived managers use the endpoints of the current params_api.json... """
+        session = FakeSession()
+        manager = CertiDigitalManager(self.config, session)
+        manager.get_working_user_info("token")
+        self.write_params([{"apiId": "getUserInfo", "apiUrl": "https://changed.example/user"}], "params_api.json")
+        manager.get_working_user_info("token")
+        self.assertNotEqual(session.requests[0]["url"], "https://changed.example/user")
+        self.assertEqual(session.requests[1]["url"], "https://changed.example/user")
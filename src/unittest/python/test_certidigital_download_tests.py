@@ -0,0 +1,68 @@
+""" Tests for the bulk download of credential details and PDFs... """
+import json
+
+from certidigital import CertiDigitalException
+from certidigital import CertiDigitalManager
+
+from certidigital_test_helper import CertiDigitalTestCase
+from certidigital_test_helper import FakeSession
+
+
+def get_details(request):
+    """ Returns the details of the uuid at the end of the url... """
+    uuid = request["url"].rsplit("/", 1)[1]
+    return json.dumps({"uuid": uuid, "payload": json.dumps({"id": "urn:credential:" + uuid})}).encode("utf-8")
+
+
+def render_pdf(request):
+    """ Returns a PDF echoing the end of the uploaded body... """
+    return b"%PDF-" + request["body"][-20:]
+
+
+class TestCertiDigitalDownload(CertiDigitalTestCase):
+    """ Checks order, memory bound and payload reuse of iter_credentials_details... """
+
+    PARAMS = {"max_concurrent_downloads": 3}
+    API_LIST = True
+
+    def setUp(self):
+        """ Creates a temporary data root with the API list and a manager over the fake session... """
+        super().setUp()
+        self.__session = FakeSession(get_details, render_pdf)
+        self.__manager = CertiDigitalManager(self.config, self.__session)
+
+    def test_order_and_bound(self):
+        """ Credentials come in the uuids order and at most 2 * max_workers uuids are taken ahead of the consumer... """
+        taken = []
+
+        def uuids():
+            for i in range(50):
+                taken.append(i)
+                yield "uuid-" + str(i)
+
+        consumed = 0
+        for credential in self.__manager.iter_credentials_details(uuids(), "token"):
+            self.assertEqual(credential.uuid, "uuid-" + str(consumed))
+            self.assertEqual(json.loads(credential.details["payload"])["id"], "urn:credential:uuid-" + str(consumed))
+            self.assertIsNone(credential.pdf_response)
+            consumed += 1
+            self.assertLessEqual(len(taken), consumed + 6)
+        self.assertEqual(consumed, 50)
+
+    def test_pdf_from_raw_details(self):
+        """ The PDF request carries the exact bytes received with the details... """
+        credentials = list(self.__manager.iter_credentials_details(["a", "b", "c"], "token", max_workers=2, with_pdf=True))
+        pdf_bodies = [request["body"] for request in self.__session.requests if request["method"] == "post"]
+        self.assertEqual(len(pdf_bodies), 3)
+        for credential in credentials:
+            self.assertEqual(credential.pdf_response.status_code, 200)
+            self.assertEqual(sum(credential.raw_details in body for body in pdf_bodies), 1)
+
+    def test_early_stop_and_wrong_workers(self):
+        """ Closing the iterator stops the downloads and max_workers must be positive... """
+        credentials = self.__manager.iter_credentials_details(("uuid-" + str(i) for i in range(1000)), "token", max_workers=2)
+        self.assertEqual(next(credentials).uuid, "uuid-0")
+        credentials.close()
+        for max_workers in (0, -1):
+            with self.assertRaises(CertiDigitalException):
+                self.__manager.iter_credentials_details(["a"], "token", max_workers=max_workers)
@@ -0,0 +1,69 @@
+""" Tests for the pluggable JSON codec... """
+import json
+import unittest
+
+import requests.exceptions
+
+from certidigital import CertiDigitalException
+from certidigital import CertiDigitalJsonCodec
+from certidigital import CertiDigitalManager
+from certidigital import CertiDigitalOutputSink
+
+from certidigital_test_helper import FakeResponse
+from certidigital_test_helper import FakeSession
+
+
+class TestCertiDigitalJsonCodec(unittest.TestCase):
+    """ Checks that every backend gives the same results and errors as the json module... """
+
+    __documents = ['{"uuid": "a", "stateId": 2, "grade": 8.5, "name": "Mar\\u00eda", "nested": {"list": [1, null, true]}}',
+                   '{"big": 123456789012345678901234567890, "nan": NaN}',
+                   '{"dup": 1, "dup": 2}',
+                   '[]']
+
+    def test_same_results_as_json(self):
+        """ Decoding str and bytes gives the same objects with both backends... """
+        for backend in ("auto", "json"):
+            codec = CertiDigitalJsonCodec(backend)
+            for document in self.__documents:
+                expected = json.loads(document)
+                self.assertEqual(repr(codec.loads(document)), repr(expected))
+                self.assertEqual(repr(codec.loads(document.encode("utf-8"))), repr(expected))
+
+    def test_same_errors_as_json(self):
+        """ Wrong documents raise json.JSONDecodeError and bytes that aren't UTF-8 UnicodeDecodeError, as with the json module... """
+        codec = CertiDigitalJsonCodec()
+        for document in ("", "{", '{"a": }', b"{"):
+            with self.assertRaises(json.JSONDecodeError):
+                codec.loads(document)
+        with self.assertRaises(UnicodeDecodeError):
+            codec.loads(b"\xff")
+
+    def test_response_errors_as_requests(self):
+        """ Wrong response bodies raise the requests JSONDecodeError, as response.json() does... """
+        for content in (b"{", b"\xff"):
+            with self.assertRaises(requests.exceptions.JSONDecodeError):
+                CertiDigitalManager.decode_json_response(FakeResponse(content))
+        manager = CertiDigitalManager(session=FakeSession(get_handler=lambda request: b"\xff"))
+        with self.assertRaises(CertiDigitalException):
+            manager.call_get_api("https://api.example/emissions", "", "", "token")
+
+    def test_dumps(self):
+        """ Pretty output is the json module's one and compact output decodes to the same data... """
+        codec = CertiDigitalJsonCodec()
+        data = {"a": [1, 2.5, "ñ"], "b": {"c": None}}
+        self.assertEqual(codec.dumps(data, indent=4), json.dumps(data, indent=4))
+        self.assertEqual(json.loads(codec.dumps_compact(data)), data)
+        self.assertNotIn(b" ", codec.dumps_compact(data))
+
+    def test_dumps_non_finite(self):
+        """ NaN and Infinity are kept (not written as null) and sink output matches the json module byte by byte... """
+        data = {"a": [None, 1e16, float("nan")], "b": {"c": float("-inf")}}
+        for backend in ("auto", "json"):
+            self.assertEqual(CertiDigitalJsonCodec(backend).dumps_compact(data), b'{"a":[null,1e+16,NaN],"b":{"c":-Infinity}}')
+        self.assertEqual(CertiDigitalOutputSink.jsonld_to_bytes({"grade": 1e16}), b'{"grade":1e+16}')
+
+    def test_wrong_backend(self):
+        """ Unknown backends are rejected... """
+        with self.assertRaises(CertiDigitalException):
+            CertiDigitalJsonCodec("simplejson")
@@ -0,0 +1,56 @@
+""" Tests for the output sinks of the downloaded credentials... """
+import json
+import os
+import tempfile
+import unittest
+
+from certidigital import CertiDigitalArchiveSink
+from certidigital import CertiDigitalFileSink
+from certidigital import CertiDigitalOutputSink
+
+
+class TestCertiDigitalOutputSink(unittest.TestCase):
+    """ Checks the per-file output and the sharded archives with their index... """
+
+    __jsonld = {"@context": "https://www.w3.org/2018/credentials/v1", "credentialSubject": {"givenName": "Ana\nMaría"}}
+
+    def setUp(self):
+        """ Creates a temporary output folder... """
+        self.__tmp_dir = tempfile.TemporaryDirectory()
+        self.__path_output = self.__tmp_dir.name
+
+    def tearDown(self):
+        """ Removes the temporary output folder... """
+        self.__tmp_dir.cleanup()
+
+    def test_file_sink_is_compact(self):
+        """ Per-file mode writes the raw payload as is and compact JSON for parsed data... """
+        with CertiDigitalFileSink(self.__path_output) as sink:
+            sink.write_jsonld("u1", json.dumps(self.__jsonld))
+            sink.write_jsonld("u2", self.__jsonld)
+            sink.write_pdf("u1", b"%PDF-1.4")
+        with open(os.path.join(self.__path_output, "u2.jsonld"), encoding="utf-8") as f:
+            content = f.read()
+        self.assertNotIn("\n    ", content)
+        self.assertEqual(json.loads(content), self.__jsonld)
+        with open(os.path.join(self.__path_output, "u1.jsonld"), encoding="utf-8") as f:
+            self.assertEqual(f.read(), json.dumps(self.__jsonld))
+
+    def test_archive_shards_and_index(self):
+        """ Artifacts are spread into shards and found again through the index, for zip, tar and jsonl.gz... """
+        for archive_format, jsonl in (("zip", False), ("tar", False), ("zip", True)):
+            prefix = archive_format + ("_jsonl" if jsonl else "")
+            with CertiDigitalArchiveSink(self.__path_output, archive_format=archive_format, jsonl=jsonl, shard_size=2, prefix=prefix) as sink:
+                for i in range(5):
+                    sink.write_jsonld("u" + str(i), self.__jsonld)
+                    sink.write_pdf("u" + str(i), b"%PDF-" + str(i).encode())
+            index = CertiDigitalArchiveSink.load_index(self.__path_output, prefix)
+            self.assertEqual(len(index), 5)
+            self.assertEqual(len({entry["jsonld"]["shard"] for entry in index.values()}), 3)
+            self.assertEqual(json.loads(CertiDigitalArchiveSink.read_artifact(self.__path_output, index["u3"]["jsonld"])), self.__jsonld)
+            self.assertEqual(CertiDigitalArchiveSink.read_artifact(self.__path_output, index["u4"]["pdf"]), b"%PDF-4")
+
+    def test_sink_is_abstract(self):
+        """ The base sink can't be created without the write methods... """
+        with self.assertRaises(TypeError):
+            CertiDigitalOutputSink()  # pylint: disable=abstract-class-instantiated
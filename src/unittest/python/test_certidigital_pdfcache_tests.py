@@ -0,0 +1,73 @@
+""" Tests for the content-addressed cache of rendered PDFs... """
+import json
+import os
+
+from certidigital import CertiDigitalManager
+from certidigital import CertiDigitalPdfCache
+
+from certidigital_test_helper import CertiDigitalTestCase
+from certidigital_test_helper import FakeSession
+
+
+def render_pdf(request):
+    """ Renders a different PDF for every request... """
+    return b"%PDF-" + str(id(request)).encode("utf-8") + b" " + str(request["params"]).encode("utf-8")
+
+
+class TestCertiDigitalPdfCache(CertiDigitalTestCase):
+    """ Checks keys, LRU eviction and that the manager only calls the wallet on cache misses... """
+
+    PARAMS = {"pdf_cache_dir": "pdfcache", "pdf_cache_max_bytes": 100000}
+    API_LIST = True
+
+    def test_keys(self):
+        """ Keys depend on the payload and the rendering options, not on its type... """
+        key = CertiDigitalPdfCache.get_key(b'{"a": 1}', "es", "diploma")
+        self.assertEqual(key, CertiDigitalPdfCache.get_key('{"a": 1}', "es", "diploma"))
+        self.assertEqual(CertiDigitalPdfCache.get_key({"a": 1, "b": 2}, "es", "diploma"), CertiDigitalPdfCache.get_key({"b": 2, "a": 1}, "es", "diploma"))
+        self.assertNotEqual(key, CertiDigitalPdfCache.get_key(b'{"a": 2}', "es", "diploma"))
+        self.assertNotEqual(key, CertiDigitalPdfCache.get_key(b'{"a": 1}', "en", "diploma"))
+        self.assertNotEqual(key, CertiDigitalPdfCache.get_key(b'{"a": 1}', "es", "transcript"))
+
+    def test_lru_eviction(self):
+        """ The least recently used PDFs are removed when the size limit is exceeded, also after reloading the folder... """
+        path_cache = os.path.join(self.path_data, "lru")
+        cache = CertiDigitalPdfCache(path_cache, 3000)
+        for name in ("a", "b", "c"):
+            cache.put(name * 64, name.encode("utf-8") * 1000)
+        self.assertEqual(cache.get("a" * 64), b"a" * 1000)
+        cache.put("d" * 64, b"d" * 1000)
+        self.assertIsNone(cache.get("b" * 64))
+        self.assertEqual(cache.size, 3000)
+        self.assertFalse(cache.put("e" * 64, b"e" * 4000))
+        for age, name in enumerate(("a", "d", "c")):
+            file_name = os.path.join(path_cache, name * 2, name * 64 + ".pdf")
+            os.utime(file_name, ns=(os.stat(file_name).st_atime_ns, 10 ** 18 - age * 10 ** 9))
+        reloaded = CertiDigitalPdfCache(path_cache, 2000)
+        self.assertEqual(reloaded.size, 2000)
+        self.assertIsNone(reloaded.get("c" * 64))
+        self.assertEqual(reloaded.get("a" * 64), b"a" * 1000)
+        reloaded.clear()
+        self.assertEqual(reloaded.size, 0)
+
+    def test_manager_uses_cache(self):
+        """ Renders of the same payload are served locally (even if the rest of the details changed), changed credentials and options reach the wallet... """
+        session = FakeSession(post_handler=render_pdf)
+        manager = CertiDigitalManager(self.config, session)
+        details = {"uuid": "1", "payload": json.dumps({"credentialSubject": {"id": "1"}})}
+        first = manager.get_credential_pdf(details, "token")
+        second = CertiDigitalManager(self.config, session).get_credential_pdf(json.dumps(details).encode("utf-8"), "token")
+        self.assertEqual(len(session.requests), 1)
+        self.assertEqual(second.status_code, 200)
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second.headers["Content-Type"], "application/pdf")
+        self.assertEqual(manager.get_credential_pdf(dict(details, status="SENT"), "token").content, first.content)
+        self.assertEqual(len(session.requests), 1)
+        self.assertIn(json.dumps(details).encode("utf-8"), session.requests[0]["body"])
+        manager.get_credential_pdf(details, "token", locale="en")
+        manager.get_credential_pdf(dict(details, payload="{}"), "token")
+        self.assertEqual(len(session.requests), 3)
+        self.assertEqual(session.requests[1]["params"], {"locale": "en", "pdfType": "diploma"})
+        manager.get_credential_pdf(details, "token", locale="es&pdfType=transcript")
+        self.assertEqual(session.requests[3]["params"], {"locale": "es&pdfType=transcript", "pdfType": "diploma"})
+        self.assertTrue(os.path.isdir(os.path.join(self.path_data, "pdfcache")))
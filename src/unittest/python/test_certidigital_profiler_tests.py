@@ -0,0 +1,50 @@
+""" Tests for the opt-in profiling of the emission pipeline phases... """
+import os
+import tracemalloc
+
+from certidigital import CertiDigitalProfiler
+from certidigital import CertiDigitalUtil
+
+from certidigital_test_helper import CertiDigitalTestCase
+
+
+class TestCertiDigitalProfiler(CertiDigitalTestCase):
+    """ Checks the phase report and that a disabled profiler does nothing... """
+
+    PARAMS = {"profiling": True}
+
+    def test_disabled(self):
+        """ Phases are no-op contexts and no report is written... """
+        profiler = CertiDigitalProfiler(False, self.config.path_output)
+        with profiler.phase("issue"):
+            pass
+        self.assertIs(profiler.phase("issue"), profiler.phase("seal"))
+        self.assertIsNone(profiler.write_report())
+        self.assertFalse(os.path.exists(self.config.path_output))
+
+    def test_report(self):
+        """ Calls are aggregated by phase, nested phases only count times and every phase gets a .prof file... """
+        profiler = CertiDigitalProfiler(True, self.config.path_output)
+        for _ in range(3):
+            with profiler.phase("fill"):
+                data = [str(i) * 10 for i in range(10000)]
+                with profiler.phase("split"):
+                    sorted(data)
+        report_file = profiler.write_report()
+        with open(report_file, encoding="UTF-8") as f:
+            report = f.read()
+        self.assertRegex(report, r"fill\s+3 ")
+        self.assertRegex(report, r"split\s+3 ")
+        self.assertIn("======== Phase fill ========", report)
+        self.assertIn("No CPU profile captured", report)
+        self.assertIn("first 1 calls", report)
+        self.assertIn("test_certidigital_profiler_tests.py", report.split("---- Top allocations")[1])
+        self.assertFalse(tracemalloc.is_tracing())
+        self.assertTrue(os.path.exists(os.path.join(self.config.path_output, "profiling_fill.prof")))
+
+    def test_config_profiler(self):
+        """ The profiling parameter enables the profiler of the configuration, used by the decorated util methods... """
+        self.assertTrue(self.config.profiler.enabled)
+        self.assertIs(self.config.profiler, self.config.profiler)
+        self.assertFalse(CertiDigitalProfiler().enabled)
+        self.assertIs(CertiDigitalUtil(self.config).config, self.config)
@@ -0,0 +1,100 @@
+""" Tests for the multi issuing center emission scheduler... """
+import threading
+
+from certidigital import CertiDigitalEmissionScheduler
+from certidigital import CertiDigitalException
+
+from certidigital_test_helper import CertiDigitalTestCase
+
+
+class FakeManager:
+    """ Stands for the manager, recording the order in which the emission blocks are issued... """
+
+    def __init__(self):
+        self.config = None
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def credentials_issue_through_template(self, issuing_center_id, credential_id, token, file_name, alias, block_id):
+        """ Records the call and returns a response with the emissions block id... """
+        with self.lock:
+            self.calls.append((issuing_center_id, file_name, block_id))
+        return [{"emissionsBlockId": str(issuing_center_id) + "-" + str(credential_id), "token": token, "alias": alias}]
+
+
+class TestCertiDigitalEmissionScheduler(CertiDigitalTestCase):
+    """ Checks fairness between issuing centers, concurrency caps and chained emission blocks... """
+
+    def setUp(self):
+        """ Creates a temporary data root and a fake manager... """
+        super().setUp()
+        self.__manager = FakeManager()
+
+    def test_weighted_round_robin(self):
+        """ With one worker, centers are served according to their weights instead of submission order... """
+        order = []
+        gate = threading.Event()
+
+        def task(manager, issuing_center_id, token):
+            gate.wait()
+            order.append(issuing_center_id)
+
+        with CertiDigitalEmissionScheduler("token", self.__manager, max_workers=1, max_per_center=1, weights={"big": 2}, config=self.config) as scheduler:
+            for _ in range(6):
+                scheduler.submit("big", task)
+            for _ in range(3):
+                scheduler.submit("small", task)
+            gate.set()
+        self.assertEqual(order[:7], ["big", "big", "small", "big", "big", "small", "big"])
+        self.assertEqual(scheduler.get_progress()["totals"]["completed"], 9)
+
+    def test_per_center_cap(self):
+        """ A center never runs more tasks than its cap, even with free workers... """
+        running = {"max": 0, "now": 0}
+        lock = threading.Lock()
+        gate = threading.Event()
+
+        def task(manager, issuing_center_id, token):
+            with lock:
+                running["now"] += 1
+                running["max"] = max(running["max"], running["now"])
+            gate.wait(0.05)
+            with lock:
+                running["now"] -= 1
+
+        with CertiDigitalEmissionScheduler("token", self.__manager, max_workers=4, max_per_center=2, config=self.config) as scheduler:
+            for _ in range(8):
+                scheduler.submit(1, task)
+        self.assertEqual(running["max"], 2)
+
+    def test_emission_blocks_are_chained(self):
+        """ Blocks of an emission run in order and reuse the emissions block id of the first one... """
+        with CertiDigitalEmissionScheduler("token", self.__manager, max_workers=4, config=self.config) as scheduler:
+            first = scheduler.submit_emission(1, 10, ["a_part1.xls", "a_part2.xls", "a_part3.xls"], "alias")
+            second = scheduler.submit_emission(2, 20, ["b_part1.xls", "b_part2.xls"], "alias")
+        self.assertEqual(len(first.result()), 3)
+        self.assertEqual(len(second.result()), 2)
+        center_1_calls = [call for call in self.__manager.calls if call[0] == 1]
+        self.assertEqual(center_1_calls, [(1, "a_part1.xls", None), (1, "a_part2.xls", "1-10"), (1, "a_part3.xls", "1-10")])
+
+    def test_wrong_weights(self):
+        """ Weights below 1 are rejected in the constructor as well as in set_weight... """
+        with self.assertRaises(CertiDigitalException):
+            CertiDigitalEmissionScheduler("token", self.__manager, weights={"x": 0}, config=self.config)
+
+    def test_wrong_caps(self):
+        """ A cap of 0 is rejected instead of falling back to the params... """
+        with self.assertRaises(CertiDigitalException):
+            CertiDigitalEmissionScheduler("token", self.__manager, max_workers=0, config=self.config)
+        with self.assertRaises(CertiDigitalException):
+            CertiDigitalEmissionScheduler("token", self.__manager, max_per_center=0, config=self.config)
+
+    def test_cancelled_tasks(self):
+        """ Tasks cancelled before starting are reported as cancelled, not failed... """
+        gate = threading.Event()
+        with CertiDigitalEmissionScheduler("token", self.__manager, max_workers=1, config=self.config) as scheduler:
+            scheduler.submit("center", lambda manager, issuing_center_id, token: gate.wait())
+            self.assertTrue(scheduler.submit("center", lambda manager, issuing_center_id, token: None).cancel())
+            gate.set()
+        totals = scheduler.get_progress()["totals"]
+        self.assertEqual((totals["completed"], totals["failed"], totals["cancelled"]), (1, 0, 1))
@@ -0,0 +1,51 @@
+""" Tests for the upload telemetry and the compressed JSON bodies sent by the manager... """
+import gzip
+import json
+import os
+
+from certidigital import CertiDigitalManager
+
+from certidigital_test_helper import CertiDigitalTestCase
+from certidigital_test_helper import FakeSession
+
+
+class TestCertiDigitalUpload(CertiDigitalTestCase):
+    """ Checks progress callbacks on multipart uploads and the optional gzip of JSON bodies... """
+
+    PARAMS = {"gzip_request_min_bytes": 1024}
+    API_LIST = True
+
+    def setUp(self):
+        """ Creates a temporary data root with the API list and an emission file... """
+        super().setUp()
+        self.__file_name = os.path.join(self.path_data, "block.xls")
+        with open(self.__file_name, "wb") as f:
+            f.write(os.urandom(200000))
+        self.__session = FakeSession()
+        self.__manager = CertiDigitalManager(self.config, self.__session)
+
+    def test_upload_progress(self):
+        """ The callback reports the streamed bytes and the throughput, ending with the whole body... """
+        reports = []
+        self.__manager.credentials_issue_through_template(1, 2, "token", self.__file_name, "alias", None, progress_callback=reports.append)
+        body = self.__session.requests[0]["body"]
+        self.assertGreater(len(body), 200000)
+        self.assertEqual(reports[-1]["bytes_sent"], len(body))
+        self.assertEqual(reports[-1]["total_bytes"], len(body))
+        self.assertGreaterEqual(reports[-1]["bytes_per_second"], 0)
+
+    def test_pdf_upload_from_bytes(self):
+        """ Serialized credentials are sent as they are... """
+        payload = json.dumps({"payload": "x" * 5000}).encode("utf-8")
+        self.__manager.get_credential_pdf(payload, "token")
+        self.assertIn(payload, self.__session.requests[0]["body"])
+
+    def test_gzip_large_json_bodies(self):
+        """ JSON bodies over gzip_request_min_bytes are compressed, small ones are sent as usual... """
+        self.__manager.seal_credentials(1, ["uuid-" + str(i) for i in range(200)], "token")
+        self.__manager.seal_credentials(1, ["uuid-0"], "token")
+        large_request, small_request = self.__session.requests
+        self.assertEqual(large_request["headers"]["Content-Encoding"], "gzip")
+        self.assertEqual(json.loads(gzip.decompress(large_request["body"]))["uuidList"][199], "uuid-199")
+        self.assertNotIn("Content-Encoding", small_request["headers"])
+        self.assertEqual(small_request["json"]["uuidList"], ["uuid-0"])
@@ -0,0 +1,38 @@
+""" Tests for the spreadsheet utilities used by the emission flow... """
+import os
+
+import pandas as pd
+
+from certidigital import CertiDigitalException
+from certidigital import CertiDigitalUtil
+
+from certidigital_test_helper import CertiDigitalTestCase
+
+
+class TestCertiDigitalUtil(CertiDigitalTestCase):
+    """ Checks the split of the recipients file into emission blocks... """
+
+    def setUp(self):
+        """ Creates a temporary data root with an emission file of 23 recipients... """
+        super().setUp()
+        self.__util = CertiDigitalUtil(self.config)
+        header_df = pd.DataFrame([["{#t}.REC.givenName", "{#t}.REC.familyName"], ["field", "field"], ["Nombre", "Apellidos"], ["Obligatorio", "Obligatorio"]])
+        recipients_df = pd.DataFrame([["Name" + str(i), "Family" + str(i)] for i in range(23)])
+        self.__file_name = os.path.join(self.path_data, "EmissionRecipientsOutput.xls")
+        self.__util.write_recipients_xls(self.__file_name, header_df, recipients_df)
+
+    def test_split_in_process_pool(self):
+        """ The process pool generates the same _partN files, in the same order, as the sequential split... """
+        sequential_files = self.__util.split_recipients_output(self.__file_name, 5)
+        sequential_data = [pd.read_excel(chunk_file, header=None) for chunk_file in sequential_files]
+        pool_files = list(self.__util.iter_recipients_output(self.__file_name, 5, processes=3))
+        self.assertEqual(pool_files, sequential_files)
+        self.assertEqual([os.path.basename(chunk_file) for chunk_file in pool_files], ["EmissionRecipientsOutput_part" + str(i) + ".xls" for i in range(1, 6)])
+        for chunk_file, expected_df in zip(pool_files, sequential_data):
+            pd.testing.assert_frame_equal(pd.read_excel(chunk_file, header=None), expected_df)
+        self.assertEqual(list(sequential_data[-1].iloc[4:, 0]), ["Name20", "Name21", "Name22"])
+
+    def test_wrong_block_size(self):
+        """ A block size below 1 is rejected on the call, before the generator is started... """
+        with self.assertRaises(CertiDigitalException):
+            self.__util.iter_recipients_output(self.__file_name, 0)
@@ -0,0 +1,72 @@
+""" Tests for the local pre-validation of emission recipients... """
+import pandas as pd
+
+from certidigital import CertiDigitalEmissionBlockStatus
+from certidigital import CertiDigitalException
+from certidigital import CertiDigitalIssuedLedger
+from certidigital import CertiDigitalRecipientValidator
+from certidigital import CertiDigitalUtil
+
+from certidigital_test_helper import CertiDigitalTestCase
+
+
+class TestCertiDigitalRecipientValidator(CertiDigitalTestCase):
+    """ Checks required fields, address formats, duplicates and the issued ledger... """
+
+    __header = [["{#t}.REC.givenName", "{#t}.REC.familyName", "{#t}.REC.primaryDeliveryAddress", "{#t}.REC.secondaryDeliveryAddress"],
+                ["field", "field", "field", "field"],
+                ["Nombre", "Apellidos", "Direccion", "Segunda direccion"],
+                ["Obligatorio", "Obligatorio", "Obligatorio", "Obligatorio"]]
+
+    def setUp(self):
+        """ Creates a temporary data root and an emission file with good and bad recipients... """
+        super().setUp()
+        recipients = [["Ana", "Garcia", "ana@uc3m.es", ""],
+                      ["Luis", "Perez", "not-an-address", ""],
+                      ["", "Lopez", "lopez@uc3m.es", ""],
+                      ["ana ", "GARCIA", "Ana@uc3m.es", ""],
+                      ["Eva", "Ruiz", "eva@uc3m.es", "https://wallet.example/eva"]]
+        self.__file_name = self.config.data_file("EmissionRecipientsOutput.xls")
+        CertiDigitalUtil(self.config).write_recipients_xls(self.__file_name, pd.DataFrame(self.__header), pd.DataFrame(recipients))
+        self.__ledger = CertiDigitalIssuedLedger(self.config.data_file("issuedLedger.json"))
+
+    def test_rejects_invalid_rows(self):
+        """ Bad rows go to the reject file with their reason, good ones to the valid file... """
+        validator = CertiDigitalRecipientValidator(self.config, ledger=self.__ledger)
+        valid_file, reject_file, num_rejected = validator.validate_recipients_output(self.__file_name, 1)
+        self.assertEqual(num_rejected, 3)
+        valid_df = pd.read_excel(valid_file, header=None)
+        self.assertEqual(list(valid_df.iloc[4:, 0]), ["Ana", "Eva"])
+        rejected_df = pd.read_excel(reject_file, header=None)
+        reasons = list(rejected_df.iloc[4:, 4])
+        self.assertIn("Wrong address format", reasons[0])
+        self.assertIn("Missing REC.givenName", reasons[1])
+        self.assertIn("Duplicated recipient", reasons[2])
+
+    def test_ledger_rejects_already_issued(self):
+        """ Recipients recorded as issued are rejected for the same credential only... """
+        validator = CertiDigitalRecipientValidator(self.config, ledger=self.__ledger)
+        valid_file, _, _ = validator.validate_recipients_output(self.__file_name, 1)
+        emission_recipients = validator.get_emission_recipients(valid_file, [{"uuid": "u1"}, {"uuid": "u2"}])
+        self.assertEqual(validator.record_issued_emissions(1, emission_recipients, [{"uuid": "u1", "stateId": 2}, {"uuid": "u2", "stateId": 2}]), 2)
+        reloaded = CertiDigitalRecipientValidator(self.config, ledger=CertiDigitalIssuedLedger(self.__ledger.file_name))
+        valid_file, _, num_rejected = reloaded.validate_recipients_output(self.__file_name, 1)
+        self.assertEqual(num_rejected, 5)
+        self.assertIsNone(valid_file)
+        _, _, num_rejected = reloaded.validate_recipients_output(self.__file_name, 2)
+        self.assertEqual(num_rejected, 3)
+
+    def test_ledger_skips_failed_emissions(self):
+        """ Only sealed emissions are recorded, so rejected, erroneous or duplicated recipients can be issued again... """
+        validator = CertiDigitalRecipientValidator(self.config, ledger=self.__ledger)
+        valid_file, _, _ = validator.validate_recipients_output(self.__file_name, 1)
+        emission_recipients = validator.get_emission_recipients(valid_file, [{"uuid": "u1"}, {"uuid": "u2"}])
+        emission_block = CertiDigitalEmissionBlockStatus()
+        emission_block.add("u1", 3)
+        emission_block.add("u2", 2)
+        self.assertEqual(validator.record_issued_emissions(1, emission_recipients, emission_block), 1)
+        valid_file, _, num_rejected = validator.validate_recipients_output(self.__file_name, 1)
+        self.assertEqual(num_rejected, 4)
+        self.assertEqual(list(pd.read_excel(valid_file, header=None).iloc[4:, 0]), ["Ana"])
+        with self.assertRaises(CertiDigitalException):
+            validator.get_emission_recipients(valid_file, [])